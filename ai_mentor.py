@@ -1,12 +1,27 @@
 """
-Hantec AI Mentor - RAG Implementation with ChromaDB
+Hantec AI Mentor - Streamlit UI (thin client of mentor_core)
 """
 
-from openai import OpenAI
+import sys
+
+# `python -m ai_mentor build-index` / `verify-index` run the offline index
+# tools (build_index.py) instead of the app
+if __name__ == "__main__" and sys.argv[1:2] in (["build-index"], ["verify-index"]):
+    from build_index import main
+    sys.exit(main(sys.argv[1:]))
+
 import streamlit as st
 import os
 import glob
 
+from knowledge_base import format_sync_report
+from answer_cache import SemanticAnswerCache
+from conversation_memory import assistant_message, display_text
+from session_store import Session, create_session_store
+from mentor_core import (
+    CONTEXT_TOKEN_BUDGET, KNOWLEDGE_BASE_PATH, RagSystemLoader, stream_message
+)
+
 # Import conversation flow module
 try:
     from conversation_flow import render_conversation_flow
@@ -27,286 +42,116 @@ st.set_page_config(
 )
 
 # ============================================================================
-# RAG SYSTEM
+# CORE
 # ============================================================================
 
-class HantecRAG:
-    def __init__(self, knowledge_base_path="data/knowledge_base"):
-        """Initialize ChromaDB and load knowledge"""
-        self.knowledge_base_path = knowledge_base_path
-        os.makedirs(knowledge_base_path, exist_ok=True)
-        
-        try:
-            import chromadb
-            from chromadb.utils import embedding_functions
-            
-            self.client = chromadb.EphemeralClient()
-            default_ef = embedding_functions.DefaultEmbeddingFunction()
-            
-            try:
-                self.collection = self.client.get_collection(
-                    name="hantec_knowledge",
-                    embedding_function=default_ef
-                )
-            except:
-                self.collection = self.client.create_collection(
-                    name="hantec_knowledge",
-                    embedding_function=default_ef,
-                    metadata={"hnsw:space": "cosine"}
-                )
-        except Exception as e:
-            st.error(f"ChromaDB initialization error: {e}")
-            raise
-        
-        self.load_knowledge_base()
-    
-    def load_knowledge_base(self):
-        """Load all files from knowledge_base folder"""
-        txt_files = glob.glob(f"{self.knowledge_base_path}/**/*.txt", recursive=True)
-        md_files = glob.glob(f"{self.knowledge_base_path}/**/*.md", recursive=True)
-        json_files = glob.glob(f"{self.knowledge_base_path}/**/*.json", recursive=True)
-        
-        all_files = txt_files + md_files + json_files
-        
-        if not all_files:
-            st.sidebar.warning(f"⚠️ No knowledge files found in {self.knowledge_base_path}")
-            st.sidebar.info("📝 Add .txt, .md, or .json files to start!")
-            return
-        
-        documents = []
-        metadatas = []
-        ids = []
-        
-        for file_path in all_files:
-            try:
-                content = self._read_file(file_path)
-                if content and len(content.strip()) > 20:
-                    documents.append(content)
-                    metadatas.append({
-                        "source": file_path,
-                        "filename": os.path.basename(file_path)
-                    })
-                    ids.append(file_path)
-            except Exception as e:
-                st.sidebar.error(f"Error loading {file_path}: {str(e)}")
-        
-        if documents:
-            try:
-                self.collection.add(
-                    documents=documents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-                st.sidebar.success(f"✅ Loaded {len(documents)} documents")
-            except Exception as e:
-                st.sidebar.error(f"Error adding to ChromaDB: {str(e)}")
-        else:
-            st.sidebar.warning("⚠️ No valid content found")
-    
-    def _read_file(self, file_path):
-        """Read file content"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except Exception as e:
-            st.sidebar.error(f"Error reading {file_path}: {e}")
-            return ""
-    
-    def retrieve(self, query, n_results=3):
-        """Retrieve relevant documents"""
-        try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
-            
-            documents = results['documents'][0] if results['documents'] else []
-            metadatas = results['metadatas'][0] if results['metadatas'] else []
-            
-            retrieved_knowledge = "\n\n".join(documents)
-            sources = [m.get('filename', 'Unknown') for m in metadatas]
-            
-            return retrieved_knowledge, sources
-        except Exception as e:
-            st.sidebar.error(f"Retrieval error: {str(e)}")
-            return "", []
-
 @st.cache_resource
-def get_rag_system():
-    """Initialize RAG system (cached)"""
-    return HantecRAG()
+def get_rag_loader():
+    """Start loading the RAG system in the background (once per process)"""
+    return RagSystemLoader().start()
 
-# ============================================================================
-# AI FUNCTIONS
-# ============================================================================
+def get_rag_system(wait=True):
+    """The RAG system, waiting for the background load if it is still running
 
-def build_system_prompt(user_context, retrieved_knowledge, sources):
-    """Build system prompt with context"""
-    source_info = f"\n\nSources: {', '.join(sources)}" if sources else ""
-    
-    return f"""You are the Hantec Markets AI Mentor, a conversational assistant guiding users through CFD trading.
+    With wait=False returns None while loading. A failed load is raised
+    once and then dropped from the cache, so the next rerun tries again.
+    """
+    loader = get_rag_loader()
+    try:
+        if loader.ready:
+            return loader.get()
+        if not wait:
+            return None
+        with st.spinner("📚 Loading knowledge base..."):
+            return loader.get()
+    except Exception:
+        get_rag_loader.clear()
+        raise
 
-USER CONTEXT:
-- Name: {user_context.get('name', 'User')}
-- State: {user_context.get('state', 'unknown')}
-- Language: {user_context.get('language', 'English')}
+@st.cache_resource
+def get_answer_cache():
+    """Process-wide semantic answer cache (shared by all sessions)"""
+    return SemanticAnswerCache()
 
-CRITICAL CONSTRAINTS:
-- NEVER mention guaranteed returns
-- NO financial advice - education only
-- ALWAYS include risk disclaimers for trading queries
-- NEVER INVENT INFORMATION - Only use facts from knowledge base
-- If knowledge base doesn't contain answer, say "I don't have specific information"
+@st.cache_resource
+def get_session_store():
+    """Session store from HANTEC_SESSION_STORE (see session_store)"""
+    return create_session_store()
 
-RESPONSE STRUCTURE:
-- Keep answers SHORT (2-4 sentences max)
-- Use bullet points for lists
-- Use **bold** for emphasis
-- Include ⚠️ for warnings
+def get_session():
+    """This browser session's state, restored from the store on a new connection.
 
-KNOWLEDGE BASE:
-{retrieved_knowledge if retrieved_knowledge else "No specific knowledge found - MUST redirect to support."}
-{source_info}
+    The session id travels in the page URL (?session=...), so a reload after
+    a restart or on another worker picks the conversation up again.
+    """
+    session = st.session_state.get('session')
+    if session is None:
+        session_id = st.query_params.get("session")
+        session = (session_id and get_session_store().load(session_id)) or Session()
+        st.query_params["session"] = session.session_id
+        st.session_state.session = session
+    return session
 
-MANDATORY DISCLAIMERS:
-- For trading queries: "⚠️ Trading involves risk. This is for educational purposes only."
+def save_session():
+    """Write the session to the store if this run (or the one before a rerun) changed it"""
+    get_session_store().save(get_session())
 
-Company: hmarkets.com | Support: support@hmarkets.com
+# ============================================================================
+# UI COMPONENTS
+# ============================================================================
 
-Remember: NEVER GUESS OR INVENT INFORMATION.
-"""
+ASSISTANT_AVATAR_HTML = """
+                <div style="width: 40px; height: 40px; background: #2d3748; border-radius: 50%; 
+                            display: flex; align-items: center; justify-content: center; 
+                            color: white; font-weight: 700; font-size: 16px;">H</div>
+            """
 
-def get_available_topics():
-    """Get list of available topics from knowledge base"""
-    available_topics = []
-    kb_path = "data/knowledge_base"
-    
-    if os.path.exists(kb_path):
-        categories = [d for d in os.listdir(kb_path) 
-                    if os.path.isdir(os.path.join(kb_path, d))]
-        
-        for category in categories:
-            cat_path = os.path.join(kb_path, category)
-            files = [f.replace('.txt', '').replace('.md', '').replace('_', ' ').title() 
-                   for f in os.listdir(cat_path) 
-                   if f.endswith(('.txt', '.md', '.json'))]
-            
-            if files:
-                available_topics.append(f"**{category.replace('_', ' ').title()}:** {', '.join(files[:5])}")
-    
-    return available_topics
+def start_request(user_input, api_key, rag_system, user_context):
+    """Start streaming the answer to a message, cancelling this session's previous one"""
+    previous = st.session_state.get('active_request')
+    if previous is not None:
+        previous.cancel()
+    session = get_session()
+    handle = stream_message(
+        user_input, api_key, rag_system, user_context,
+        session.chat_history, get_answer_cache(), session.memory
+    )
+    st.session_state.active_request = handle
+    return handle
 
-def process_message(user_input, api_key, rag_system, user_context):
-    """Process user message and get AI response"""
-    client = OpenAI(api_key=api_key)
-    
-    # RAG: Retrieve relevant knowledge from local files
-    with st.spinner("🔍 Searching your knowledge base..."):
-        retrieved_knowledge, sources = rag_system.retrieve(user_input, n_results=3)
-    
-    # Track all sources
-    all_sources = []
-    if sources:
-        all_sources.extend(sources)
-    
-    # Check if we found relevant information
-    if not retrieved_knowledge or len(retrieved_knowledge.strip()) < 50:
-        # No relevant knowledge found
-        available_topics = get_available_topics()
-        topics_text = "\n".join([f"- {topic}" for topic in available_topics[:4]]) if available_topics else "various trading topics"
-        
-        response = f"I don't have specific information about that in my knowledge base.\n\n**But I can help you with:**\n{topics_text}\n\nFor other questions, please contact **support@hmarkets.com** or use our live chat (24/5).\n\nWhat would you like to know?"
-        
-        return response
-    
-    # Build system prompt and get AI response
-    system_prompt = build_system_prompt(user_context, retrieved_knowledge, all_sources)
-    
-    with st.spinner("🤖 AI Mentor is thinking..."):
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                *st.session_state.chat_history[-10:]
-            ],
-            temperature=0.1,
-            max_tokens=500
-        )
-        
-        ai_response = response.choices[0].message.content
-        
-        # Add source attribution at the bottom
-        if all_sources:
-            # Remove duplicates
-            unique_sources = []
-            seen = set()
-            for s in all_sources:
-                if s not in seen:
-                    unique_sources.append(s)
-                    seen.add(s)
-            
-            source_text = "\n\n---\n📚 **Source:** " + ", ".join(unique_sources)
-            ai_response += source_text
-        
-        return ai_response
-    
-    # Check if we found relevant information (from files or website)
-    if not retrieved_knowledge or len(retrieved_knowledge.strip()) < 50:
-        # No relevant knowledge found anywhere
-        available_topics = get_available_topics()
-        topics_text = "\n".join([f"- {topic}" for topic in available_topics[:4]]) if available_topics else "various trading topics"
-        
-        response = f"I don't have specific information about that in my knowledge base.\n\n**But I can help you with:**\n{topics_text}\n\nFor other questions, please contact **support@hmarkets.com** or use our live chat (24/5).\n\nWhat would you like to know?"
-        
-        return response
-    
-    # Build system prompt and get AI response
-    system_prompt = build_system_prompt(user_context, retrieved_knowledge, all_sources)
-    
-    with st.spinner("🤖 AI Mentor is thinking..."):
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                *st.session_state.chat_history[-10:]
-            ],
-            temperature=0.1,
-            max_tokens=500
-        )
-        
-        ai_response = response.choices[0].message.content
-        
-        # Add source attribution at the bottom
-        if all_sources:
-            # Remove duplicates
-            unique_sources = []
-            seen = set()
-            for s in all_sources:
-                if s not in seen:
-                    unique_sources.append(s)
-                    seen.add(s)
-            
-            source_text = "\n\n---\n📚 **Source:** " + ", ".join(unique_sources)
-            ai_response += source_text
-        
-        return ai_response
+def render_load_status(rag_system):
+    """Sidebar summary of the startup sync"""
+    if rag_system.serving:
+        st.sidebar.success(f"✅ Serving {rag_system.document_count()} documents (shared read-only index)")
+        return
+    report = rag_system.last_sync_report
+    if report is None:
+        return
+    for error in report['errors']:
+        st.sidebar.error(error)
+    
+    if not (report['added'] or report['updated'] or report['unchanged']):
+        st.sidebar.warning(f"⚠️ No knowledge files found in {rag_system.knowledge_base_path}")
+        st.sidebar.info("📝 Add .txt, .md, or .json files to start!")
+        return
+    
+    indexed = report['added'] + report['updated'] + report['unchanged']
+    st.sidebar.success(f"✅ Loaded {indexed} documents ({report['added'] + report['updated']} embedded)")
 
-# ============================================================================
-# UI COMPONENTS
-# ============================================================================
+def finish_answer(ai_response, api_key):
+    """Add a streamed answer to the chat (sources apart from the text) and roll the summary"""
+    session = get_session()
+    session.chat_history.append(assistant_message(ai_response))
+    session.memory.update(session.chat_history, api_key)
 
 def render_message(msg, user_name):
     """Render a single chat message"""
     if msg["role"] == "assistant":
         col_avatar, col_content = st.columns([1, 15])
         with col_avatar:
-            st.markdown("""
-                <div style="width: 40px; height: 40px; background: #2d3748; border-radius: 50%; 
-                            display: flex; align-items: center; justify-content: center; 
-                            color: white; font-weight: 700; font-size: 16px;">H</div>
-            """, unsafe_allow_html=True)
+            st.markdown(ASSISTANT_AVATAR_HTML, unsafe_allow_html=True)
         with col_content:
-            st.markdown(msg['content'])
+            st.markdown(display_text(msg))
         st.markdown("<br>", unsafe_allow_html=True)
     else:
         col_content, col_avatar = st.columns([15, 1])
@@ -320,6 +165,28 @@ def render_message(msg, user_name):
             """, unsafe_allow_html=True)
         st.markdown("<br>", unsafe_allow_html=True)
 
+def render_streaming_message(chunks):
+    """Render an assistant message chunk by chunk as it streams in; returns the full text"""
+    col_avatar, col_content = st.columns([1, 15])
+    with col_avatar:
+        st.markdown(ASSISTANT_AVATAR_HTML, unsafe_allow_html=True)
+    with col_content:
+        placeholder = st.empty()
+        text = ""
+        chunks = iter(chunks)
+        # The spinner covers retrieval and the wait for the first token
+        with st.spinner("🤖 AI Mentor is thinking..."):
+            first_chunk = next(chunks, None)
+        if first_chunk is not None:
+            text = first_chunk
+            placeholder.markdown(text + "▌")
+            for chunk in chunks:
+                text += chunk
+                placeholder.markdown(text + "▌")
+        placeholder.markdown(text)
+    st.markdown("<br>", unsafe_allow_html=True)
+    return text
+
 def render_welcome_card(emoji, title, items, button_text, button_key, bg_color="white"):
     """Render a welcome card"""
     text_color = "white" if bg_color != "white" else "#1a202c"
@@ -401,13 +268,38 @@ with st.sidebar:
     st.markdown("---")
     
     st.markdown("### 📚 Knowledge Base")
-    if os.path.exists("data/knowledge_base"):
-        files = glob.glob("data/knowledge_base/**/*.*", recursive=True)
+    if os.path.exists(KNOWLEDGE_BASE_PATH):
+        files = glob.glob(os.path.join(KNOWLEDGE_BASE_PATH, "**", "*.*"), recursive=True)
         st.caption(f"📁 {len([f for f in files if os.path.isfile(f)])} files found")
     
-    if st.button("🔄 Reload Knowledge Base"):
-        st.cache_resource.clear()
-        st.rerun()
+    col_sync, col_rebuild = st.columns(2)
+    with col_sync:
+        sync_clicked = st.button("🔄 Sync", help="Embed new/edited files, drop deleted ones")
+    with col_rebuild:
+        rebuild_clicked = st.button("♻️ Rebuild", help="Re-embed every file from scratch")
+    
+    if sync_clicked or rebuild_clicked:
+        try:
+            rag_system = get_rag_system()
+        except Exception as e:
+            st.error(f"Failed to initialize RAG system: {e}")
+        else:
+            sync_progress = st.progress(0.0, text="Syncing knowledge base...")
+            try:
+                report = rag_system.sync(
+                    rebuild=rebuild_clicked,
+                    progress=lambda done, total: sync_progress.progress(done / total, text=f"Embedded {done}/{total} passages")
+                )
+            except Exception as e:
+                st.error(f"Sync failed: {e}")
+            else:
+                if report['added'] or report['updated'] or report['removed'] or rebuild_clicked:
+                    get_answer_cache().invalidate()
+                for error in report['errors']:
+                    st.error(error)
+                st.success(f"✅ {format_sync_report(report)}")
+            finally:
+                sync_progress.empty()
     
     st.markdown("---")
     
@@ -415,33 +307,45 @@ with st.sidebar:
     st.caption("✓ Model: GPT-4o-mini")
     st.caption("✓ Temperature: 0.1")
     st.caption("✓ Max Tokens: 500")
-    st.caption("✓ RAG: ChromaDB")
-
-# Initialize session state
-if 'conversation_started' not in st.session_state:
-    st.session_state.conversation_started = False
-if 'selected_option' not in st.session_state:
-    st.session_state.selected_option = None
-if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
-if 'user_state' not in st.session_state:
-    st.session_state.user_state = "onboarding"
-if 'onboarding_step' not in st.session_state:
-    st.session_state.onboarding_step = 2
-if 'last_processed_message' not in st.session_state:
-    st.session_state.last_processed_message = ""
-if 'message_counter' not in st.session_state:
-    st.session_state.message_counter = 0
+    st.caption(f"✓ Context Budget: {CONTEXT_TOKEN_BUDGET} tokens")
+    cache_stats = get_answer_cache().get_stats()
+    st.caption(f"✓ Answer Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['size']} cached)")
+    rag_caption = st.empty()
+
+# Session state (st.rerun() skips the end of the script, so changes made
+# before a rerun are saved here on the next run)
+session = get_session()
+save_session()
 
 # Initialize RAG
 try:
-    rag_system = get_rag_system()
+    rag_loader = get_rag_loader()
+    rag_system = get_rag_system(wait=False)
 except Exception as e:
     st.error(f"Failed to initialize RAG system: {e}")
     st.stop()
 
+if rag_system is None:
+    st.sidebar.info("⏳ Loading knowledge base in the background...")
+else:
+    render_load_status(rag_system)
+    st.sidebar.caption(f"Index ready in {rag_loader.elapsed:.1f}s")
+    rag_caption.caption(f"✓ RAG: {rag_system.describe_vector_backend()}")
+    
+    with st.sidebar.expander("📊 Retrieval Scores"):
+        score_stats = rag_system.get_score_stats()
+        top = score_stats['top_distance']
+        st.caption(f"Cutoff: distance ≤ {score_stats['max_distance']} (or BM25 ≥ {score_stats['min_lexical_score']})")
+        st.caption(f"Queries: {score_stats['queries']} · No-answer: {score_stats['no_answer']}")
+        if top['total']:
+            st.caption(f"Best-hit distance p50 ≈ {top['p50']:.2f} · p90 ≈ {top['p90']:.2f}")
+            peak = max(n for _, _, n in top['bins'])
+            for lower, upper, count in top['bins']:
+                bar = "█" * max(1, round(20 * count / peak))
+                st.caption(f"`{lower:.2f}–{upper:.2f}` {bar} {count}")
+
 # Main content
-if not st.session_state.conversation_started:
+if not session.conversation_started:
     # ==================== WELCOME SCREEN ====================
     
     st.markdown(f"""
@@ -469,12 +373,12 @@ if not st.session_state.conversation_started:
             "🚀 Start Live Trading", "btn_start_trading",
             "linear-gradient(135deg, #8B0000 0%, #B22222 100%)"
         ):
-            st.session_state.selected_option = "start_trading"
-            st.session_state.conversation_started = True
-            st.session_state.chat_history = [{
-                "role": "assistant", 
+            session.selected_option = "start_trading"
+            session.conversation_started = True
+            session.set_chat([{
+                "role": "assistant",
                 "content": f"Awesome, {user_name}! Let's get you started 💝\n\nBefore we begin — can you tell me how familiar you are with trading?"
-            }]
+            }])
             st.rerun()
     
     with col2:
@@ -483,12 +387,12 @@ if not st.session_state.conversation_started:
             ["📊 Master the fundamentals", "📈 Try simple examples", "📉 Level up your skills"],
             "📚 Learn CFDs", "btn_learn_cfds"
         ):
-            st.session_state.selected_option = "learn_cfds"
-            st.session_state.conversation_started = True
-            st.session_state.chat_history = [{
+            session.selected_option = "learn_cfds"
+            session.conversation_started = True
+            session.set_chat([{
                 "role": "assistant",
                 "content": f"Great choice, {user_name}! Let's build your trading knowledge 📚\n\nWhat would you like to learn about?"
-            }]
+            }])
             st.rerun()
     
     with col3:
@@ -497,12 +401,12 @@ if not st.session_state.conversation_started:
             ["🗺️ Dashboard walkthrough", "📈 Features overview", "📊 Charts and tools"],
             "💬 Take a Quick Tour", "btn_take_tour"
         ):
-            st.session_state.selected_option = "take_tour"
-            st.session_state.conversation_started = True
-            st.session_state.chat_history = [{
+            session.selected_option = "take_tour"
+            session.conversation_started = True
+            session.set_chat([{
                 "role": "assistant",
                 "content": f"Perfect, {user_name}! I'll show you around 🗺️\n\nWhat would you like to explore first?"
-            }]
+            }])
             st.rerun()
     
     # Chat input on welcome screen
@@ -519,28 +423,30 @@ if not st.session_state.conversation_started:
     with col_mic:
         st.markdown("<div style='padding-top: 8px; font-size: 20px; color: #94a3b8;'>🎤</div>", unsafe_allow_html=True)
     
-    if welcome_input and welcome_input != st.session_state.last_processed_message:
+    if welcome_input and welcome_input != session.last_processed_message:
         if not api_key:
             st.error("❌ Please enter your OpenAI API key in the sidebar", icon="🔒")
         else:
             try:
-                st.session_state.last_processed_message = welcome_input
-                st.session_state.conversation_started = True
-                st.session_state.selected_option = "general"
+                session.last_processed_message = welcome_input
+                session.conversation_started = True
+                session.selected_option = "general"
                 
                 # Add user message
-                st.session_state.chat_history = [{"role": "user", "content": welcome_input}]
+                session.set_chat([{"role": "user", "content": welcome_input}])
                 
                 # Get AI response
                 user_context = {
-                    'state': st.session_state.user_state,
-                    'step': st.session_state.onboarding_step,
+                    'state': session.user_state,
+                    'step': session.onboarding_step,
                     'language': user_language,
                     'name': user_name
                 }
                 
-                ai_response = process_message(welcome_input, api_key, rag_system, user_context)
-                st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
+                ai_response = render_streaming_message(
+                    start_request(welcome_input, api_key, get_rag_system(), user_context)
+                )
+                finish_answer(ai_response, api_key)
                 
                 st.rerun()
             
@@ -551,7 +457,7 @@ else:
     # ==================== CONVERSATION INTERFACE ====================
     
     # Check if this is "Learn CFDs" - use conversational flow
-    if st.session_state.selected_option == "learn_cfds" and CONVERSATION_FLOW_AVAILABLE:
+    if session.selected_option == "learn_cfds" and CONVERSATION_FLOW_AVAILABLE:
         st.markdown("### 📚 Learn CFDs - Personalized Learning Path")
         st.markdown("---")
         
@@ -562,8 +468,8 @@ else:
         
         # Back button
         if st.button("← Back to Home", key="back_from_flow"):
-            st.session_state.conversation_started = False
-            st.session_state.selected_option = None
+            session.conversation_started = False
+            session.selected_option = None
             st.rerun()
     
     else:
@@ -575,11 +481,11 @@ else:
             "general": "Getting started!"
         }
         
-        thread_title = thread_titles.get(st.session_state.selected_option, "Chat")
+        thread_title = thread_titles.get(session.selected_option, "Chat")
         st.markdown(f"### {thread_title}")
         
         # Display chat history
-        for msg in st.session_state.chat_history:
+        for msg in session.chat_history:
             render_message(msg, user_name)
         
         # Chat input
@@ -591,7 +497,7 @@ else:
             user_input = st.text_input(
                 "Message",
                 placeholder="Ask me anything...",
-                key=f"chat_input_field_{st.session_state.message_counter}",
+                key=f"chat_input_field_{session.message_counter}",
                 label_visibility="collapsed"
             )
         
@@ -599,29 +505,32 @@ else:
             st.markdown("<div style='padding-top: 8px; font-size: 20px; color: #94a3b8;'>🎤</div>", unsafe_allow_html=True)
         
         # Process chat input
-        if user_input and user_input != st.session_state.last_processed_message:
+        if user_input and user_input != session.last_processed_message:
             if not api_key:
                 st.error("❌ Please enter your OpenAI API key in the sidebar", icon="🔒")
             else:
                 try:
-                    st.session_state.last_processed_message = user_input
+                    session.last_processed_message = user_input
                     
                     # Add user message
-                    st.session_state.chat_history.append({"role": "user", "content": user_input})
+                    session.chat_history.append({"role": "user", "content": user_input})
                     
                     # Get AI response
                     user_context = {
-                        'state': st.session_state.user_state,
-                        'step': st.session_state.onboarding_step,
+                        'state': session.user_state,
+                        'step': session.onboarding_step,
                         'language': user_language,
                         'name': user_name
                     }
                     
-                    ai_response = process_message(user_input, api_key, rag_system, user_context)
-                    st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
+                    render_message(session.chat_history[-1], user_name)
+                    ai_response = render_streaming_message(
+                        start_request(user_input, api_key, get_rag_system(), user_context)
+                    )
+                    finish_answer(ai_response, api_key)
                     
                     # Clear input for next message
-                    st.session_state.message_counter += 1
+                    session.message_counter += 1
                     st.rerun()
                 
                 except Exception as e:
@@ -634,15 +543,17 @@ else:
         
         with col_back:
             if st.button("← Back", use_container_width=True):
-                st.session_state.conversation_started = False
+                session.conversation_started = False
                 st.rerun()
         
         with col_clear:
             if st.button("🗑️ Clear Chat", use_container_width=True):
-                st.session_state.chat_history = []
-                st.session_state.last_processed_message = ""
+                session.set_chat([])
+                session.last_processed_message = ""
                 st.rerun()
 
+save_session()
+
 # Footer
 st.markdown("---")
 st.caption("""
@@ -0,0 +1,201 @@
+"""
+Hantec AI Mentor - Semantic Answer Cache & Per-Session Response Memo
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+# Cosine similarity two questions need to share the same answer
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+# Responses remembered per session by ResponseMemo
+DEFAULT_MEMO_ENTRIES = 32
+
+_PUNCTUATION = re.compile(r'[^\w\s/$%.]')
+_WHITESPACE = re.compile(r'\s+')
+# Short questions that lean on earlier turns ("tell me more about it") mean
+# different things in different conversations - never answer them from cache
+_FOLLOW_UP = re.compile(r'\b(it|its|that|this|those|these|them|they|more|else|above|again|previous)\b')
+FOLLOW_UP_MAX_WORDS = 6
+
+# ============================================================================
+# QUERY NORMALIZATION
+# ============================================================================
+
+def normalize_query(query):
+    """Lowercase, drop stray punctuation and collapse whitespace"""
+    query = _PUNCTUATION.sub(' ', query.lower())
+    return _WHITESPACE.sub(' ', query).strip(' .')
+
+def is_cacheable_query(query):
+    """Check if a question stands on its own (see _FOLLOW_UP)"""
+    normalized = normalize_query(query)
+    if not normalized:
+        return False
+    return not (len(normalized.split()) <= FOLLOW_UP_MAX_WORDS and _FOLLOW_UP.search(normalized))
+
+def normalize_vector(embedding):
+    """Unit-length float32 copy of an embedding"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class SemanticAnswerCache:
+    """LRU + TTL cache of final answers, matched by query embedding similarity.
+
+    Entries are bucketed by scope (e.g. language and a fingerprint of the
+    user context the answer was written for) and only compared within it.
+    All entries belong to one knowledge-base version: the first lookup or
+    store with a different version drops everything. An exact repeat of a
+    normalized question is found without comparing vectors.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()  # (scope, normalized query) -> entry
+        self._kb_version = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expired': 0, 'invalidations': 0}
+
+    def _check_version(self, kb_version):
+        if kb_version != self._kb_version:
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._entries.clear()
+            self._kb_version = kb_version
+
+    def _drop_expired(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry['created'] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        self.stats['expired'] += len(expired)
+
+    def lookup_exact(self, query, scope, kb_version):
+        """Cached answer for this exact (normalized) question, or None. Misses are not counted."""
+        with self._lock:
+            self._check_version(kb_version)
+            key = (scope, normalize_query(query))
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['created'] > self.ttl_seconds:
+                del self._entries[key]
+                self.stats['expired'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry['answer']
+
+    def lookup(self, embedding, scope, kb_version):
+        """Cached answer for the most similar question above the threshold, or None"""
+        vector = normalize_vector(embedding)
+        with self._lock:
+            self._check_version(kb_version)
+            self._drop_expired(time.time())
+            candidates = [(key, entry) for key, entry in self._entries.items() if key[0] == scope]
+            if not candidates:
+                self.stats['misses'] += 1
+                return None
+            matrix = np.stack([entry['vector'] for _, entry in candidates])
+            similarities = matrix @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self.stats['misses'] += 1
+                return None
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry['answer']
+
+    def store(self, query, embedding, scope, kb_version, answer):
+        """Cache the answer to a question, evicting the least recently used entries"""
+        with self._lock:
+            self._check_version(kb_version)
+            key = (scope, normalize_query(query))
+            self._entries[key] = {
+                'vector': normalize_vector(embedding),
+                'answer': answer,
+                'created': time.time()
+            }
+            self._entries.move_to_end(key)
+            self.stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self):
+        """Drop every cached answer (e.g. after the knowledge base changed)"""
+        with self._lock:
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._entries.clear()
+
+    def get_stats(self):
+        """Counters plus current size and hit rate"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+# ============================================================================
+# PER-SESSION RESPONSE MEMO
+# ============================================================================
+
+def profile_hash(profile):
+    """Short fingerprint of a user profile dict (key order doesn't matter)"""
+    encoded = json.dumps(profile, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+class ResponseMemo:
+    """Small LRU of generated responses keyed on (kind, profile hash, question).
+
+    Meant to live in one user's session: a widget that keeps its value
+    across Streamlit reruns would otherwise send the same request to the
+    LLM on every rerun. Questions are matched after normalize_query.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MEMO_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(kind, profile, question=""):
+        return (kind, profile_hash(profile), normalize_query(question))
+
+    def get(self, key):
+        """Memoized response for key, or None"""
+        response = self._entries.get(key)
+        if response is None:
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return response
+
+    def put(self, key, response):
+        """Remember a response, evicting the least recently used ones"""
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,98 @@
+"""
+Hantec AI Mentor - Background Event Loop & Sync Bridges for Async Pipelines
+"""
+
+import asyncio
+import queue
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+_DONE = object()
+
+# ============================================================================
+# EVENT LOOP
+# ============================================================================
+
+def get_event_loop():
+    """The process-wide event loop, running in a daemon thread.
+
+    Streamlit runs every script rerun on its own thread, so async work is
+    handed to this one long-lived loop instead of asyncio.run() per message -
+    async HTTP clients and their keep-alive connections stay bound to it.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="hantec-async", daemon=True)
+            thread.start()
+        return _loop
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the background loop and block for its result"""
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+# ============================================================================
+# STREAMING BRIDGE
+# ============================================================================
+
+class StreamHandle:
+    """Iterate an async generator from synchronous code, with cancellation.
+
+    The generator runs on the background loop and pushes items onto a queue
+    that the caller's thread drains. cancel() - from any thread - cancels
+    the task, which unwinds the pipeline (including an in-flight LLM
+    request); iteration then just ends. Exceptions are re-raised to the
+    caller. Abandoning iteration early also cancels.
+    """
+
+    def __init__(self, agen):
+        self._queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._future = asyncio.run_coroutine_threadsafe(self._pump(agen), get_event_loop())
+
+    async def _pump(self, agen):
+        try:
+            async for item in agen:
+                self._queue.put(item)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self._queue.put(e)
+        finally:
+            await agen.aclose()
+            self._queue.put(_DONE)
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        """Stop the pipeline; safe to call more than once or after it finished"""
+        if not self._future.done():
+            self._cancelled.set()
+            self._future.cancel()
+            # A task cancelled before it started never reaches _pump's finally
+            self._queue.put(_DONE)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def done(self):
+        return self._future.done()
@@ -0,0 +1,168 @@
+"""
+Hantec AI Mentor - Retrieval Quality & Latency Benchmark
+
+Run with: python benchmark_retrieval.py [--k 5] [--backend numpy] [--json out.json] [--baseline old.json]
+
+Builds a fresh index of the knowledge base in a temporary directory (timing
+the build), then asks every question in data/retrieval_benchmark.json and
+checks where its expected source files rank. Reports recall@k (share of
+questions with an expected file in the top k), MRR (mean of 1/rank of the
+first expected file, 0 when absent) and p50/p95/p99 latency of retrieval
+with a precomputed query embedding and end to end (embedding included,
+uncached). With --baseline, exits with 1 if recall or MRR dropped, or p95
+retrieval latency grew, by more than the tolerances.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmark_stats import latency_stats
+from mentor_core import (
+    EMBED_BATCH_SIZE, EMBED_WORKERS, IO_WORKERS, KNOWLEDGE_BASE_PATH, MAX_DISTANCE, VECTOR_BACKEND, HantecRAG
+)
+from vector_backends import VECTOR_BACKENDS
+
+DEFAULT_QUESTIONS_PATH = os.path.join("data", "retrieval_benchmark.json")
+
+def load_questions(path):
+    """[{"question", "expected": [filenames]}] from the checked-in question set"""
+    with open(path, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    for entry in questions:
+        if not entry.get('question') or not entry.get('expected'):
+            raise ValueError(f"Benchmark entry needs a question and expected files: {entry}")
+    return questions
+
+def first_hit_rank(passages, expected):
+    """1-based rank of the first passage from an expected file, or None"""
+    for rank, passage in enumerate(passages, start=1):
+        if passage.get("filename") in expected:
+            return rank
+    return None
+
+def run_benchmark(rag_system, questions, k, repeats):
+    """Quality metrics, latencies and per-question results for questions against rag_system"""
+    end_to_end = []
+    retrieval = []
+    results = []
+    for entry in questions:
+        question = entry['question']
+        expected = set(entry['expected'])
+
+        start = time.perf_counter()
+        embedding = rag_system.embedding_function([question])[0]
+        passages = rag_system.retrieve_passages(question, n_results=k, query_embedding=embedding)
+        end_to_end.append((time.perf_counter() - start) * 1000)
+
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rag_system.retrieve_passages(question, n_results=k, query_embedding=embedding)
+            retrieval.append((time.perf_counter() - start) * 1000)
+
+        rank = first_hit_rank(passages, expected)
+        results.append({
+            'question': question,
+            'expected': sorted(expected),
+            'rank': rank,
+            'retrieved': [p.get("filename") for p in passages]
+        })
+
+    hits = [r for r in results if r['rank'] is not None]
+    return {
+        'questions': len(questions),
+        'k': k,
+        f'recall@{k}': round(len(hits) / len(results), 4) if results else 0.0,
+        'mrr': round(sum(1.0 / r['rank'] for r in hits) / len(results), 4) if results else 0.0,
+        'latency': {
+            'retrieval': latency_stats(retrieval),
+            'end_to_end': latency_stats(end_to_end)
+        },
+        'results': results
+    }
+
+def find_regressions(report, baseline, quality_tolerance, latency_tolerance):
+    """Human-readable descriptions of metrics that got worse than baseline beyond tolerance"""
+    regressions = []
+    k = report['k']
+    for metric in (f'recall@{k}', 'mrr'):
+        if metric in baseline and report[metric] < baseline[metric] - quality_tolerance:
+            regressions.append(f"{metric} {baseline[metric]:.3f} → {report[metric]:.3f}")
+    old_p95 = baseline.get('latency', {}).get('retrieval', {}).get('p95_ms')
+    new_p95 = report['latency']['retrieval']['p95_ms']
+    if old_p95 and new_p95 > old_p95 * (1 + latency_tolerance):
+        regressions.append(f"retrieval p95 {old_p95:.2f} ms → {new_p95:.2f} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure retrieval quality and latency on a fixed question set")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS_PATH)
+    parser.add_argument("--knowledge-base", default=KNOWLEDGE_BASE_PATH)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5, help="Timed retrievals per question")
+    parser.add_argument("--backend", choices=VECTOR_BACKENDS, default=VECTOR_BACKEND)
+    parser.add_argument("--no-hybrid", action="store_true", help="Vector search only (no BM25 fusion)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--quality-tolerance", type=float, default=0.01)
+    parser.add_argument("--latency-tolerance", type=float, default=0.25, help="Allowed p95 growth (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    with tempfile.TemporaryDirectory() as index_dir:
+        start = time.perf_counter()
+        rag_system = HantecRAG(
+            knowledge_base_path=args.knowledge_base,
+            persist_directory=index_dir,
+            hybrid=not args.no_hybrid,
+            max_distance=MAX_DISTANCE,
+            vector_backend=args.backend,
+            embed_workers=EMBED_WORKERS,
+            embed_batch_size=EMBED_BATCH_SIZE,
+            io_workers=IO_WORKERS
+        )
+        build_s = time.perf_counter() - start
+        rag_system.warm_up()
+
+        report = run_benchmark(rag_system, questions, args.k, args.repeats)
+        report['backend'] = rag_system.vector_backend_name
+        report['hybrid'] = rag_system.hybrid
+        report['index'] = {
+            'documents': rag_system.document_count(),
+            'passages': rag_system.passage_count(),
+            'build_s': round(build_s, 3),
+            'timings': {stage: round(s, 3) for stage, s in rag_system.last_sync_report['timings'].items()}
+        }
+
+    k = args.k
+    index = report['index']
+    print(f"Index: {index['documents']} documents, {index['passages']} passages, built in {index['build_s']:.2f}s "
+          f"({report['backend']}{', hybrid' if report['hybrid'] else ''})")
+    print(f"{report['questions']} questions: recall@{k} {report[f'recall@{k}']:.3f} · MRR {report['mrr']:.3f}")
+    for name, stats in report['latency'].items():
+        print(f"  {name:<11} p50 {stats['p50_ms']:.2f} ms · p95 {stats['p95_ms']:.2f} ms · p99 {stats['p99_ms']:.2f} ms")
+    for result in report['results']:
+        if result['rank'] is None:
+            print(f"  ✗ {result['question']} (expected {', '.join(result['expected'])}; "
+                  f"got {', '.join(result['retrieved']) or 'nothing'})")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.quality_tolerance, args.latency_tolerance)
+        for regression in regressions:
+            print(f"⚠️ Regression: {regression}")
+        if regressions:
+            return 1
+        print("✓ No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+"""
+Hantec AI Mentor - Latency Statistics shared by the benchmark scripts
+"""
+
+import numpy as np
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) if values else 0.0
+
+def latency_stats(latencies):
+    """p50/p95/p99/mean of latencies in ms"""
+    return {
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(float(np.mean(latencies)), 3) if latencies else 0.0
+    }
@@ -0,0 +1,128 @@
+"""
+Hantec AI Mentor - Vector Backend Benchmark (Chroma HNSW vs exact NumPy)
+
+Run with: python benchmark_vector_backends.py [--queries 200] [--k 10] [--json out.json]
+
+Syncs the configured index (HANTEC_* variables), then runs the same query
+embeddings through both backends. Reports per-query and batched latency,
+and recall@k of Chroma against the exact NumPy results.
+"""
+
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from benchmark_stats import latency_stats
+from embedding_store import InMemoryPassageStore
+from mentor_core import create_rag_system
+from vector_backends import ChromaVectorBackend, NumpyVectorBackend
+
+SAMPLE_QUESTIONS = [
+    "What is leverage in forex trading?",
+    "What is the minimum deposit for a live account?",
+    "How do I withdraw funds?",
+    "What is a CFD?",
+    "Which trading platforms do you offer?",
+    "How does the EUR/USD pair move on NFP days?",
+    "What are the trading hours for gold?",
+    "What is a stop loss order?",
+]
+
+def sample_queries(store, n, seed):
+    """The sample questions plus opening sentences of random passages"""
+    rng = random.Random(seed)
+    queries = list(SAMPLE_QUESTIONS)
+    rows = list(range(len(store)))
+    rng.shuffle(rows)
+    for row in rows:
+        if len(queries) >= n:
+            break
+        text = store.passage(row)['text'].strip()
+        sentence = text.split('. ')[0][:200]
+        if len(sentence) > 20:
+            queries.append(sentence)
+    return queries[:n]
+
+def time_single(backend, embeddings, k, repeats):
+    """Per-query latencies in ms (best of repeats for each query)"""
+    latencies = []
+    for embedding in embeddings:
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            backend.search([embedding], k)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        latencies.append(best)
+    return latencies
+
+def time_batch(backend, embeddings, k, repeats):
+    """Best wall time in ms for searching all embeddings in one call"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        backend.search(embeddings, k)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def recall_at_k(results, exact, k):
+    """Mean fraction of the exact top k found in results' top k"""
+    scores = []
+    for found, truth in zip(results, exact):
+        truth_ids = {p['id'] for p in truth[:k]}
+        if truth_ids:
+            scores.append(len(truth_ids & {p['id'] for p in found[:k]}) / len(truth_ids))
+    return float(np.mean(scores)) if scores else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Chroma HNSW and exact NumPy vector search")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    rag_system = create_rag_system(sync=True, serving=False)
+    stored = rag_system.collection.get(include=["documents", "metadatas", "embeddings"])
+    store = InMemoryPassageStore(stored['ids'], stored['documents'], stored['metadatas'], stored['embeddings'])
+    backends = [ChromaVectorBackend(rag_system.collection), NumpyVectorBackend(store)]
+
+    queries = sample_queries(store, args.queries, args.seed)
+    embeddings = rag_system.embed_queries(queries)
+    exact = backends[1].search(embeddings, args.k)
+
+    report = {
+        'passages': len(store),
+        'dim': int(store.vectors.shape[1]) if len(store) else 0,
+        'queries': len(queries),
+        'k': args.k,
+        'backends': {}
+    }
+    for backend in backends:
+        backend.search(embeddings[:1], args.k)  # warm-up
+        latencies = time_single(backend, embeddings, args.k, args.repeats)
+        batch_ms = time_batch(backend, embeddings, args.k, args.repeats)
+        report['backends'][backend.name] = {
+            **latency_stats(latencies),
+            'batch_ms': round(batch_ms, 3),
+            'batch_per_query_ms': round(batch_ms / len(queries), 4),
+            f'recall@{args.k}': round(recall_at_k(backend.search(embeddings, args.k), exact, args.k), 4)
+        }
+
+    print(f"{report['passages']} passages x {report['dim']} dims, {report['queries']} queries, k={args.k}")
+    print(f"{'backend':<8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'batch ms':>9} {'recall':>7}")
+    for name, stats in report['backends'].items():
+        print(f"{name:<8} {stats['p50_ms']:>8.3f} {stats['p95_ms']:>8.3f} {stats['p99_ms']:>8.3f} "
+              f"{stats['batch_ms']:>9.2f} {stats[f'recall@{args.k}']:>7.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
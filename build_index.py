@@ -0,0 +1,203 @@
+"""
+Hantec AI Mentor - Offline Index Build
+
+    python -m ai_mentor build-index [--output data/index] [--workers 4] [--batch-size 64] [--dtype float16]
+    python -m ai_mentor verify-index [data/index]
+
+build-index reads the knowledge base, cleans, chunks and embeds every file
+and writes a serving snapshot (see embedding_store): embeddings, columnar
+passages, the index manifest and the BM25 index, with a SHA-256 of every
+file. Pods load it read-only with HANTEC_SERVING_INDEX=1 (and
+`server.py --no-sync`), so they never embed at startup. The snapshot name
+is derived from the content and build settings, so the same inputs give the
+same index version.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from embedding_store import EMBEDDING_DTYPES, EmbeddingStore, write_snapshot
+from ingestion import chunk_files, iter_embedding_batches, throughput
+from knowledge_base import MANIFEST_FILENAME, IndexManifest, build_topic_catalog, plan_sync
+from mentor_core import (
+    EMBED_BATCH_SIZE, EMBED_WORKERS, EMBEDDING_DTYPE, EMBEDDING_MODEL, INDEX_DIR, IO_WORKERS, KNOWLEDGE_BASE_PATH
+)
+from retrieval import LEXICAL_INDEX_FILENAME, LexicalIndex
+from text_processing import CLEANING_VERSION, DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, find_boilerplate_lines
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def build_index(knowledge_base_path=KNOWLEDGE_BASE_PATH, output=INDEX_DIR, chunk_size=DEFAULT_CHUNK_SIZE,
+                chunk_overlap=DEFAULT_CHUNK_OVERLAP, dtype=EMBEDDING_DTYPE, batch_size=EMBED_BATCH_SIZE,
+                workers=EMBED_WORKERS, io_workers=IO_WORKERS, progress=None):
+    """Build a serving snapshot of the knowledge base into output; returns a build report
+
+    Files are read and chunked on io_workers threads; passages are embedded
+    batch_size at a time on workers processes (see ingestion).
+    progress(done, total) is called after every embedded batch. Raises
+    ValueError if the knowledge base yields no passages.
+    """
+    settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "cleaning": CLEANING_VERSION}
+    report = {
+        'documents': 0,
+        'chunks': 0,
+        'errors': [],
+        'timings': {'read': 0.0, 'chunk': 0.0, 'embed': 0.0, 'write': 0.0, 'total': 0.0}
+    }
+    start = time.perf_counter()
+
+    def read_file(file_path):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except Exception as e:
+            report['errors'].append(f"Error reading {file_path}: {e}")
+            return None
+
+    manifest = IndexManifest()
+    manifest.reset(settings)
+    plan = plan_sync(knowledge_base_path, manifest, read_file, max_workers=io_workers)
+    sources = plan.added
+    report['timings']['read'] = time.perf_counter() - start
+
+    t0 = time.perf_counter()
+    manifest.boilerplate = find_boilerplate_lines(plan.contents.values())
+    documents, metadatas, ids = chunk_files(
+        sources, plan.contents, manifest.boilerplate, chunk_size, chunk_overlap, max_workers=io_workers
+    )
+    report['timings']['chunk'] = time.perf_counter() - t0
+    if not ids:
+        details = "".join(f"\n  {error}" for error in report['errors'])
+        raise ValueError(f"No passages to index in {knowledge_base_path}{details}")
+
+    t0 = time.perf_counter()
+    batches = []
+    for _, batch_end, vectors in iter_embedding_batches(documents, batch_size=batch_size, workers=workers):
+        batches.append(vectors)
+        if progress:
+            progress(batch_end, len(documents))
+    embeddings = np.vstack(batches)
+    report['timings']['embed'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for source in sources:
+        manifest.set(source, plan.entries[source])
+    manifest.topics = build_topic_catalog(manifest.sources(), knowledge_base_path)
+    index_version = manifest.version()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest.path = os.path.join(tmp_dir, MANIFEST_FILENAME)
+        manifest.save()
+        lexical_index = LexicalIndex(os.path.join(tmp_dir, LEXICAL_INDEX_FILENAME))
+        for document, metadata, passage_id in zip(documents, metadatas, ids):
+            lexical_index.add(passage_id, document, metadata["source"])
+        lexical_index.save()
+
+        os.makedirs(output, exist_ok=True)
+        report['path'] = write_snapshot(
+            output, ids, documents, metadatas, embeddings, index_version, dtype=dtype,
+            attachments={
+                MANIFEST_FILENAME: manifest.path,
+                LEXICAL_INDEX_FILENAME: lexical_index.path
+            },
+            build_info={
+                'builder': "build-index",
+                'embedding_model': EMBEDDING_MODEL,
+                'settings': settings,
+                'workers': workers,
+                'batch_size': batch_size
+            }
+        )
+    report['timings']['write'] = time.perf_counter() - t0
+
+    report['index_version'] = index_version
+    report['documents'] = len(sources)
+    report['chunks'] = len(ids)
+    report['timings']['total'] = time.perf_counter() - start
+    report['throughput'] = throughput(len(sources), len(ids), report['timings'])
+    return report
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def _print_progress(done, total):
+    print(f"\r  embedded {done}/{total} passages", end="" if done < total else "\n", file=sys.stderr, flush=True)
+
+def _build_command(args):
+    print(f"Building index from {args.knowledge_base} into {args.output} "
+          f"({args.workers} worker{'s' if args.workers > 1 else ''}, batch {args.batch_size}, "
+          f"{args.io_workers} I/O threads, {args.dtype})")
+    try:
+        report = build_index(
+            knowledge_base_path=args.knowledge_base,
+            output=args.output,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            dtype=args.dtype,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            io_workers=args.io_workers,
+            progress=_print_progress
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    for error in report['errors']:
+        print(f"⚠️ {error}")
+    timings = report['timings']
+    throughput = report['throughput']
+    print(f"Index {report['index_version']}: {report['documents']} documents, {report['chunks']} passages")
+    print(f"  read {timings['read']:.2f}s · chunk {timings['chunk']:.2f}s · embed {timings['embed']:.2f}s · "
+          f"write {timings['write']:.2f}s · total {timings['total']:.2f}s")
+    print(f"  {throughput['docs_per_s']:.1f} docs/s · {throughput['chunks_per_s']:.1f} chunks/s "
+          f"(embedding {throughput['embed_chunks_per_s']:.1f} chunks/s)")
+    print(f"  → {report['path']}")
+    return 1 if report['errors'] else 0
+
+def _verify_command(args):
+    try:
+        store = EmbeddingStore.open(args.index_dir, verify=True)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    if store is None:
+        print(f"❌ No index snapshot in {args.index_dir}")
+        return 1
+    build = store.header.get('build', {})
+    print(f"✓ {store.path}: {len(store)} passages x {store.dim} dims ({store.dtype}), "
+          f"index {store.index_version}, built by {build.get('builder', 'unknown')}, "
+          f"{len(store.header['files'])} files verified")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ai_mentor", description="Hantec AI Mentor index tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build-index", help="Build a read-only serving index from the knowledge base")
+    build.add_argument("--knowledge-base", default=KNOWLEDGE_BASE_PATH)
+    build.add_argument("--output", default=INDEX_DIR or "data/index")
+    build.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    build.add_argument("--chunk-overlap", type=int, default=DEFAULT_CHUNK_OVERLAP)
+    build.add_argument("--dtype", choices=EMBEDDING_DTYPES, default=EMBEDDING_DTYPE)
+    build.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Passages per embedding call")
+    build.add_argument("--workers", type=int, default=EMBED_WORKERS, help="Embedding processes")
+    build.add_argument("--io-workers", type=int, default=IO_WORKERS, help="Threads reading and chunking files")
+    build.set_defaults(handler=_build_command)
+
+    verify = commands.add_parser("verify-index", help="Check a serving index against its checksums")
+    verify.add_argument("index_dir", nargs="?", default=INDEX_DIR or "data/index")
+    verify.set_defaults(handler=_verify_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Hantec AI Mentor - Token-Budgeted Context Assembly
+"""
+
+import re
+
+# Input-token budget for one chat completion: system prompt (template +
+# knowledge) plus the chat history tail.
+DEFAULT_TOKEN_BUDGET = 3000
+# Share of the budget the chat history may use at most
+HISTORY_BUDGET_SHARE = 0.35
+# Don't bother squeezing in a trimmed passage smaller than this
+MIN_PASSAGE_TOKENS = 60
+# Per-message framing the chat API adds on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+CHARS_PER_TOKEN = 4  # Fallback estimate when tiktoken is not installed
+
+_SENTENCE_END = re.compile(r'[.!?](?=\s)')
+_encoding = None
+_encoding_loaded = False
+
+# ============================================================================
+# TOKEN COUNTING
+# ============================================================================
+
+def _get_encoding():
+    """tiktoken encoding for gpt-4o models, or None if tiktoken is unavailable"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+def estimate_tokens(text):
+    """Token count of text (exact with tiktoken, ~4 chars/token otherwise)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def estimate_message_tokens(message):
+    """Tokens one chat message costs, including the API's framing"""
+    return estimate_tokens(message.get('content', '')) + MESSAGE_OVERHEAD_TOKENS
+
+def trim_to_tokens(text, max_tokens):
+    """Cut text to at most max_tokens, preferring to end on a sentence boundary"""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        trimmed = encoding.decode(encoding.encode(text)[:max_tokens])
+    else:
+        trimmed = text[:max_tokens * CHARS_PER_TOKEN]
+    sentence_ends = [m.end() for m in _SENTENCE_END.finditer(trimmed)]
+    if sentence_ends and sentence_ends[-1] > len(trimmed) // 2:
+        trimmed = trimmed[:sentence_ends[-1]]
+    return trimmed.rstrip() + " …"
+
+# ============================================================================
+# CONTEXT ASSEMBLY
+# ============================================================================
+
+def select_history(history, max_tokens):
+    """Newest-first selection of chat messages that fit in max_tokens.
+
+    The latest message (the user's question) is always kept, trimmed if it
+    alone is over budget. Returned in chronological order.
+    """
+    selected = []
+    used = 0
+    for message in reversed(history):
+        cost = estimate_message_tokens(message)
+        if used + cost > max_tokens:
+            if not selected:
+                content = trim_to_tokens(message['content'], max_tokens - MESSAGE_OVERHEAD_TOKENS)
+                selected.append({**message, 'content': content})
+                used += estimate_message_tokens(selected[-1])
+            break
+        selected.append(message)
+        used += cost
+    selected.reverse()
+    return selected, used
+
+def select_passages(passages, max_tokens):
+    """Greedy best-first packing of ranked passages into max_tokens.
+
+    Passages are taken in the order given (retrieval rank, best first);
+    exact duplicates are skipped and the first passage that does not fit is
+    trimmed if enough room is left for it to be useful.
+    """
+    selected = []
+    used = 0
+    seen = set()
+    for passage in passages:
+        text = passage['text'].strip()
+        if not text or text in seen:
+            continue
+        cost = estimate_tokens(text)
+        remaining = max_tokens - used
+        if cost > remaining:
+            if remaining >= MIN_PASSAGE_TOKENS:
+                text = trim_to_tokens(text, remaining)
+                selected.append({**passage, 'text': text})
+                used += estimate_tokens(text)
+            break
+        seen.add(text)
+        selected.append({**passage, 'text': text})
+        used += cost
+    return selected, used
+
+def build_context(passages, history, reserved_tokens=0, token_budget=DEFAULT_TOKEN_BUDGET,
+                  history_share=HISTORY_BUDGET_SHARE):
+    """Fit retrieved passages and the chat history tail into one token budget.
+
+    reserved_tokens is what the fixed part of the system prompt costs. The
+    history gets at most history_share of the budget; knowledge gets whatever
+    is left. Returns a dict with the knowledge text, the sources it came
+    from, the history messages to send and a token breakdown.
+    """
+    available = max(token_budget - reserved_tokens, 0)
+    history_messages, history_tokens = select_history(history, int(available * history_share))
+    selected, knowledge_tokens = select_passages(passages, available - history_tokens)
+
+    sources = []
+    for passage in selected:
+        filename = passage.get('filename', 'Unknown')
+        if filename not in sources:
+            sources.append(filename)
+
+    return {
+        'knowledge': "\n\n".join(p['text'] for p in selected),
+        'sources': sources,
+        'history': history_messages,
+        'tokens': {
+            'reserved': reserved_tokens,
+            'knowledge': knowledge_tokens,
+            'history': history_tokens,
+            'total': reserved_tokens + knowledge_tokens + history_tokens,
+            'budget': token_budget
+        },
+        'passages_used': len(selected),
+        'passages_dropped': len(passages) - len(selected)
+    }
@@ -0,0 +1,142 @@
+"""
+Hantec AI Mentor - Rolling Conversation Memory (running summary + recent turns)
+
+Instead of resending the raw chat tail every turn, the model sees a short
+summary of the older turns plus the newest messages, each capped at
+MESSAGE_TOKEN_CAP. Messages folded into the summary are flagged
+("summarized") in the chat history itself, so the history stays the single
+record the UI renders and the session store persists. Assistant messages
+keep their source list under "sources", apart from the model-facing
+"content"; the footer is rendered from it.
+"""
+
+import asyncio
+import logging
+import re
+
+from async_runner import get_event_loop
+from context_builder import estimate_tokens, trim_to_tokens
+from llm_client import astream_chat_completion, get_async_openai_client
+
+logger = logging.getLogger(__name__)
+
+# Newest messages always sent verbatim (3 user/assistant turns)
+RECENT_MESSAGES = 6
+# Older unsummarized messages needed before a summary update (saves LLM calls)
+SUMMARY_BATCH_MESSAGES = 4
+# Input tokens one history message may cost at most
+MESSAGE_TOKEN_CAP = 300
+SUMMARY_MAX_TOKENS = 200
+SUMMARY_MODEL = "gpt-4o-mini"
+
+SOURCE_FOOTER = "\n\n---\n📚 **Source:** "
+_SOURCE_FOOTER = re.compile(r'\n\n---\n📚 \*\*Source:\*\* (.*)\Z', re.DOTALL)
+
+SUMMARY_PROMPT = """You maintain a running summary of a chat between a trader and the Hantec Markets AI Mentor.
+Merge the new messages into the summary. Keep what matters for later turns: the user's goals,
+experience, preferences, open questions and facts already explained. Drop greetings, disclaimers
+and repetition. Write at most 120 words of plain prose."""
+
+# ============================================================================
+# SOURCE FOOTERS
+# ============================================================================
+
+def format_source_footer(sources):
+    """Source attribution appended to an answer for display"""
+    return SOURCE_FOOTER + ", ".join(sources) if sources else ""
+
+def split_source_footer(text):
+    """(answer without footer, [sources]) of an answer as displayed"""
+    match = _SOURCE_FOOTER.search(text)
+    if not match:
+        return text, []
+    return text[:match.start()], [source.strip() for source in match.group(1).split(",") if source.strip()]
+
+def assistant_message(answer):
+    """History entry for a displayed answer: model-facing content plus its sources"""
+    content, sources = split_source_footer(answer)
+    message = {"role": "assistant", "content": content}
+    if sources:
+        message["sources"] = sources
+    return message
+
+def display_text(message):
+    """Message content with its source footer, as shown in the chat"""
+    return message['content'] + format_source_footer(message.get('sources'))
+
+def model_message(message):
+    """Role and content only, footer stripped and capped at MESSAGE_TOKEN_CAP"""
+    content = message['content']
+    if message['role'] == "assistant":
+        content = split_source_footer(content)[0]
+    if estimate_tokens(content) > MESSAGE_TOKEN_CAP:
+        content = trim_to_tokens(content, MESSAGE_TOKEN_CAP)
+    return {"role": message['role'], "content": content}
+
+# ============================================================================
+# MEMORY
+# ============================================================================
+
+class ConversationMemory:
+    """Running summary of a conversation's older turns.
+
+    model_history() gives what the model should see; update() folds
+    messages that left the recent window into the summary with one small
+    LLM call, on the background loop. Only one update runs at a time.
+    """
+
+    __slots__ = ('summary', '_updating')
+
+    def __init__(self, summary=""):
+        self.summary = summary
+        self._updating = False
+
+    def model_history(self, history):
+        """Model-ready messages not yet in the summary (the recent window, plus any update lag)"""
+        return [model_message(m) for m in history if not m.get('summarized')]
+
+    def pending(self, history):
+        """Unsummarized messages older than the recent window"""
+        unsummarized = [m for m in history if not m.get('summarized')]
+        return unsummarized[:-RECENT_MESSAGES] if len(unsummarized) > RECENT_MESSAGES else []
+
+    def needs_update(self, history):
+        return not self._updating and len(self.pending(history)) >= SUMMARY_BATCH_MESSAGES
+
+    async def aupdate(self, history, api_key):
+        """Fold pending messages into the summary; returns True if it changed"""
+        if not self.needs_update(history):
+            return False
+        self._updating = True
+        try:
+            messages = self.pending(history)
+            transcript = "\n".join(f"{m['role']}: {model_message(m)['content']}" for m in messages)
+            summary = "".join([token async for token in astream_chat_completion(
+                get_async_openai_client(api_key),
+                model=SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": f"Summary so far:\n{self.summary or '(none)'}\n\nNew messages:\n{transcript}"}
+                ],
+                temperature=0,
+                max_tokens=SUMMARY_MAX_TOKENS
+            )]).strip()
+            if not summary:
+                return False
+            self.summary = summary
+            for message in messages:
+                message['summarized'] = True
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Conversation summary update failed (will retry next turn): {e}")
+            return False
+        finally:
+            self._updating = False
+
+    def update(self, history, api_key):
+        """Start aupdate on the background loop if it is due; returns its future or None"""
+        if not api_key or not self.needs_update(history):
+            return None
+        return asyncio.run_coroutine_threadsafe(self.aupdate(history, api_key), get_event_loop())
@@ -0,0 +1,265 @@
+"""
+Hantec AI Mentor - Memory-Mapped Embedding Snapshot (shared read-only serving index)
+
+A worker serves the snapshot that was current when it opened the index;
+restart workers (e.g. a rolling restart) to move them to a newer one. The
+previous snapshot is kept until the one after it is published, so workers
+still on it keep running meanwhile.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from vector_backends import normalize_rows
+
+SNAPSHOT_DIRNAME = "serving"
+SNAPSHOT_VERSION = 2
+CURRENT_FILENAME = "CURRENT"
+HEADER_FILENAME = "snapshot.json"
+EMBEDDING_DTYPES = ("float32", "float16")
+
+# Passage columns. Text columns are one UTF-8 blob plus row offsets; dict
+# columns (few distinct values) are int32 codes into a value list kept in
+# the header; int columns are plain int32 arrays.
+TEXT_COLUMNS = ("id", "text", "heading")
+DICT_COLUMNS = ("source", "filename", "url")
+INT_COLUMNS = ("start", "end", "chunk")
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def _save(directory, name, array):
+    np.save(os.path.join(directory, f"{name}.npy"), array, allow_pickle=False)
+
+def _write_text_column(directory, name, values):
+    encoded = [(value or "").encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    _save(directory, f"{name}.blob", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    _save(directory, f"{name}.offsets", offsets)
+
+def _write_dict_column(directory, name, values):
+    dictionary = list(dict.fromkeys(values))
+    codes = {value: code for code, value in enumerate(dictionary)}
+    _save(directory, f"{name}.codes", np.array([codes[v] for v in values], dtype=np.int32))
+    return dictionary
+
+def snapshot_root(persist_directory):
+    return os.path.join(persist_directory, SNAPSHOT_DIRNAME)
+
+def current_snapshot(persist_directory):
+    """Directory of the snapshot readers should open, or None if there is none"""
+    try:
+        with open(os.path.join(snapshot_root(persist_directory), CURRENT_FILENAME), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def snapshot_name(index_version, dtype):
+    return f"v{SNAPSHOT_VERSION}-{index_version}-{dtype}"
+
+def is_current_snapshot(persist_directory, index_version, dtype):
+    """Check if the published snapshot holds this index version and dtype"""
+    current = current_snapshot(persist_directory)
+    return current is not None and current.split('.')[0] == snapshot_name(index_version, dtype)
+
+def embedding_matrix(embeddings, count):
+    """float32 (count x dim) matrix of count embeddings ((0 x 0) when there are none)"""
+    if not count:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.asarray(embeddings, dtype=np.float32).reshape(count, -1)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_snapshot(persist_directory, ids, documents, metadatas, embeddings, index_version, dtype="float32",
+                   attachments=None, build_info=None):
+    """Write passages and their unit-normalized embeddings as a new snapshot.
+
+    attachments maps file names to paths copied into the snapshot (the
+    index manifest and BM25 index), so a snapshot is a self-contained
+    artifact. The header records a SHA-256 of every file and build_info.
+    Every write goes to a new directory (the snapshot name plus a publish
+    stamp), which is then published through the CURRENT file, so a snapshot
+    being read is never replaced or partially visible. The snapshot that was
+    current before stays on disk for workers still serving it; older ones
+    are deleted (workers that still have them mapped keep reading the
+    unlinked files until they restart).
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype {dtype!r} (use one of {EMBEDDING_DTYPES})")
+    root = snapshot_root(persist_directory)
+    directory = f"{snapshot_name(index_version, dtype)}.{time.time_ns():x}"
+    final_path = os.path.join(root, directory)
+    tmp_path = os.path.join(root, f".tmp-{directory}-{os.getpid()}")
+    os.makedirs(root, exist_ok=True)
+    os.makedirs(tmp_path)
+
+    matrix = embedding_matrix(embeddings, len(ids))
+    _save(tmp_path, "vectors", normalize_rows(matrix).astype(dtype))
+
+    columns = {'id': list(ids), 'text': list(documents)}
+    for column in TEXT_COLUMNS + DICT_COLUMNS + INT_COLUMNS:
+        if column not in columns:
+            columns[column] = [metadata.get(column) for metadata in metadatas]
+    for column in TEXT_COLUMNS:
+        _write_text_column(tmp_path, column, columns[column])
+    dictionaries = {column: _write_dict_column(tmp_path, column, columns[column]) for column in DICT_COLUMNS}
+    for column in INT_COLUMNS:
+        _save(tmp_path, column, np.array([v or 0 for v in columns[column]], dtype=np.int32))
+    for filename, source_path in (attachments or {}).items():
+        shutil.copyfile(source_path, os.path.join(tmp_path, filename))
+
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'index_version': index_version,
+        'count': len(ids),
+        'dim': int(matrix.shape[1]) if len(ids) else 0,
+        'dtype': dtype,
+        'dictionaries': dictionaries,
+        'build': {'created_at': time.time(), **(build_info or {})},
+        'files': {filename: file_sha256(os.path.join(tmp_path, filename)) for filename in sorted(os.listdir(tmp_path))}
+    }
+    with open(os.path.join(tmp_path, HEADER_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(header, f)
+
+    previous = current_snapshot(persist_directory)
+    os.rename(tmp_path, final_path)
+    pointer_tmp = os.path.join(root, f".tmp-{CURRENT_FILENAME}-{os.getpid()}")
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        f.write(directory)
+    os.replace(pointer_tmp, os.path.join(root, CURRENT_FILENAME))
+
+    for entry in os.listdir(root):
+        if entry not in (directory, previous, CURRENT_FILENAME) and not entry.startswith('.tmp-'):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return final_path
+
+# ============================================================================
+# READING
+# ============================================================================
+
+class EmbeddingStore:
+    """Read-only view of a snapshot; every array is memory-mapped.
+
+    Processes that open the same snapshot share its pages through the OS
+    page cache, so N workers cost one copy of the embeddings and texts.
+    Only the id -> row map is built per process. With verify=True every
+    file is checked against its recorded SHA-256 first.
+    """
+
+    def __init__(self, path, verify=False):
+        self.path = path
+        with open(os.path.join(path, HEADER_FILENAME), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version in {path}")
+        self.header = header
+        if verify:
+            self.verify()
+        self.index_version = header['index_version']
+        self.dtype = header['dtype']
+        self.dim = header['dim']
+        self._count = header['count']
+        self._dictionaries = header['dictionaries']
+        self.vectors = self._load("vectors")
+        self._text = {
+            column: (self._load(f"{column}.blob"), self._load(f"{column}.offsets"))
+            for column in TEXT_COLUMNS
+        }
+        self._codes = {column: self._load(f"{column}.codes") for column in DICT_COLUMNS}
+        self._ints = {column: self._load(column) for column in INT_COLUMNS}
+        self._rows = {self._text_value('id', row): row for row in range(self._count)}
+
+    @classmethod
+    def open(cls, persist_directory, verify=False):
+        """The current snapshot of an index directory, or None if there is none"""
+        name = current_snapshot(persist_directory)
+        while name is not None:
+            try:
+                return cls(os.path.join(snapshot_root(persist_directory), name), verify=verify)
+            except FileNotFoundError:
+                # Superseded and deleted while being opened: open the new one
+                latest = current_snapshot(persist_directory)
+                if latest == name:
+                    raise
+                name = latest
+        return None
+
+    def verify(self):
+        """Raise ValueError unless every file matches its recorded checksum"""
+        for filename, expected in self.header['files'].items():
+            path = os.path.join(self.path, filename)
+            if not os.path.exists(path) or file_sha256(path) != expected:
+                raise ValueError(f"Snapshot file {filename} in {self.path} is missing or corrupt")
+
+    def attachment(self, filename):
+        """Path of a file attached to the snapshot, or None"""
+        return os.path.join(self.path, filename) if filename in self.header['files'] else None
+
+    def _load(self, name):
+        path = os.path.join(self.path, f"{name}.npy")
+        try:
+            return np.load(path, mmap_mode='r', allow_pickle=False)
+        except ValueError:
+            # Zero-length arrays (e.g. no passage has a heading) can't be mapped
+            return np.load(path, allow_pickle=False)
+
+    def __len__(self):
+        return self._count
+
+    def _text_value(self, column, row):
+        blob, offsets = self._text[column]
+        return bytes(blob[offsets[row]:offsets[row + 1]]).decode('utf-8')
+
+    def row_of(self, passage_id):
+        """Row of a passage id, or None"""
+        return self._rows.get(passage_id)
+
+    def passage(self, row):
+        """Passage dict (metadata, id and text) for a row, shaped like a Chroma result"""
+        passage = {column: self._text_value(column, row) for column in TEXT_COLUMNS}
+        for column in DICT_COLUMNS:
+            value = self._dictionaries[column][self._codes[column][row]]
+            if value is not None:
+                passage[column] = value
+        for column in INT_COLUMNS:
+            passage[column] = int(self._ints[column][row])
+        return passage
+
+    def vector(self, row):
+        """Unit-length float32 embedding of a row"""
+        return np.asarray(self.vectors[row], dtype=np.float32)
+
+class InMemoryPassageStore:
+    """Same interface as EmbeddingStore, built from arrays in memory (no snapshot)"""
+
+    def __init__(self, ids, documents, metadatas, embeddings):
+        self.vectors = normalize_rows(embedding_matrix(embeddings, len(ids)))
+        self._passages = [
+            {**metadata, "id": passage_id, "text": document}
+            for passage_id, document, metadata in zip(ids, documents, metadatas)
+        ]
+        self._rows = {passage_id: row for row, passage_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self._passages)
+
+    def row_of(self, passage_id):
+        return self._rows.get(passage_id)
+
+    def passage(self, row):
+        return dict(self._passages[row])
+
+    def vector(self, row):
+        return self.vectors[row]
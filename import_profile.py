@@ -0,0 +1,85 @@
+"""
+Hantec AI Mentor - Import-Time Profile
+
+Run with: python import_profile.py [module ...] [--top 15] [--json out.json]
+
+Imports each module (default: mentor_core and conversation_flow) in a fresh
+interpreter with `python -X importtime`. Prints the total import time, the
+slowest top-level packages, and whether any of the heavy dependencies that
+should only load on first use were pulled in.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+DEFAULT_MODULES = ["mentor_core", "conversation_flow"]
+# Loaded lazily (by the warm-up thread or the first request), never at import
+DEFERRED_PACKAGES = ("chromadb", "onnxruntime", "openai", "httpx", "tiktoken")
+
+def profile_import(module):
+    """Parsed `-X importtime` output: [(self_us, cumulative_us, depth, name)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if not fields[0].strip().isdigit():
+            continue  # the column header
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(fields[0]), int(fields[1]), depth, name.strip()))
+    return entries
+
+def summarize(module, entries, top):
+    """Total time, slowest top-level packages and deferred packages that got imported"""
+    packages = {}
+    for self_us, _, _, name in entries:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    imported = {name.split(".")[0] for _, _, _, name in entries}
+    total_us = sum(self_us for self_us, _, _, _ in entries)
+    return {
+        'module': module,
+        'total_ms': round(total_us / 1000, 1),
+        'modules_imported': len(entries),
+        'slowest_packages': [
+            {'package': package, 'ms': round(us / 1000, 1)}
+            for package, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        'deferred_imported': sorted(p for p in DEFERRED_PACKAGES if p in imported)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the app's modules")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    reports = []
+    for module in args.modules:
+        report = summarize(module, profile_import(module), args.top)
+        reports.append(report)
+        print(f"import {module}: {report['total_ms']} ms ({report['modules_imported']} modules)")
+        for entry in report['slowest_packages']:
+            print(f"  {entry['package']:<28} {entry['ms']:>8.1f} ms")
+        if report['deferred_imported']:
+            print(f"  ⚠️ imported at startup: {', '.join(report['deferred_imported'])}")
+        else:
+            print("  ✓ no deferred dependency imported")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+
+if __name__ == "__main__":
+    main()
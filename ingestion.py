@@ -0,0 +1,114 @@
+"""
+Hantec AI Mentor - Ingestion Pipeline (parallel chunking, batched and parallel embedding)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from text_processing import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, chunk_text, clean_document
+
+# Passages per embedding call (and per upsert)
+DEFAULT_EMBED_BATCH_SIZE = 64
+# Threads for reading and preprocessing files
+DEFAULT_IO_WORKERS = min(8, os.cpu_count() or 1)
+
+_worker_embedding_function = None
+
+# ============================================================================
+# PREPROCESSING
+# ============================================================================
+
+def chunk_file(source, content, boilerplate, chunk_size=DEFAULT_CHUNK_SIZE, chunk_overlap=DEFAULT_CHUNK_OVERLAP):
+    """Clean and split one file into passages; returns documents/metadatas/ids lists
+
+    Chunk start/end offsets refer to the cleaned text, not the raw file.
+    """
+    cleaned, doc_metadata = clean_document(content, boilerplate)
+    documents = []
+    metadatas = []
+    ids = []
+    for chunk in chunk_text(cleaned, chunk_size=chunk_size, overlap=chunk_overlap):
+        documents.append(chunk['text'])
+        metadatas.append({
+            "source": source,
+            "filename": os.path.basename(source),
+            "heading": chunk['heading'],
+            "start": chunk['start'],
+            "end": chunk['end'],
+            "chunk": chunk['index'],
+            **doc_metadata
+        })
+        ids.append(f"{source}#{chunk['index']}")
+    return documents, metadatas, ids
+
+def chunk_files(sources, contents, boilerplate, chunk_size=DEFAULT_CHUNK_SIZE,
+                chunk_overlap=DEFAULT_CHUNK_OVERLAP, max_workers=1):
+    """chunk_file over several files (in a thread pool if max_workers > 1), in order"""
+    def run(source):
+        return chunk_file(source, contents[source], boilerplate, chunk_size, chunk_overlap)
+
+    if max_workers > 1 and len(sources) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(run, sources))
+    else:
+        results = [run(source) for source in sources]
+
+    documents = []
+    metadatas = []
+    ids = []
+    for file_documents, file_metadatas, file_ids in results:
+        documents.extend(file_documents)
+        metadatas.extend(file_metadatas)
+        ids.extend(file_ids)
+    return documents, metadatas, ids
+
+# ============================================================================
+# EMBEDDING
+# ============================================================================
+
+def _init_embedding_worker():
+    """Load the embedding model (once per worker process)"""
+    global _worker_embedding_function
+    from chromadb.utils import embedding_functions
+    _worker_embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+def _embed_in_worker(texts):
+    return np.asarray(_worker_embedding_function(texts), dtype=np.float32)
+
+def iter_embedding_batches(texts, embedding_function=None, batch_size=DEFAULT_EMBED_BATCH_SIZE, workers=1):
+    """Embed texts in batches, yielding (start, end, float32 matrix) in order.
+
+    With workers > 1 the batches are spread over that many processes, each
+    loading its own copy of the model, and results stream back while later
+    batches are still being embedded. Otherwise embedding_function (or a new
+    default one) runs in this process, where ONNX Runtime already spreads
+    each call over the cores (intra-op threads).
+    """
+    spans = [(start, min(start + batch_size, len(texts))) for start in range(0, len(texts), batch_size)]
+    if not spans:
+        return
+
+    if workers > 1 and len(spans) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_embedding_worker) as pool:
+            results = pool.map(_embed_in_worker, [texts[start:end] for start, end in spans])
+            for (start, end), vectors in zip(spans, results):
+                yield start, end, vectors
+        return
+
+    if embedding_function is None:
+        _init_embedding_worker()
+        embedding_function = _worker_embedding_function
+    for start, end in spans:
+        yield start, end, np.asarray(embedding_function(texts[start:end]), dtype=np.float32)
+
+def throughput(documents, chunks, timings):
+    """Docs/s and chunks/s over the whole run, plus the embedding stage's own rate"""
+    total = timings.get('total', 0.0)
+    embed = timings.get('embed', 0.0)
+    return {
+        'docs_per_s': documents / total if total else 0.0,
+        'chunks_per_s': chunks / total if total else 0.0,
+        'embed_chunks_per_s': chunks / embed if embed else 0.0
+    }
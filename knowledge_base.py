@@ -0,0 +1,286 @@
+"""
+Hantec AI Mentor - Knowledge Base Files & Index Manifest
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+KNOWLEDGE_EXTENSIONS = ('.txt', '.md', '.json')
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 2
+MIN_CONTENT_LENGTH = 20  # Shorter files are not worth indexing
+TOPICS_PER_CATEGORY = 5
+GENERAL_CATEGORY = "General"
+
+# ============================================================================
+# FILE DISCOVERY
+# ============================================================================
+
+def list_knowledge_files(knowledge_base_path):
+    """List all .txt, .md and .json files under the knowledge base folder"""
+    all_files = []
+    for ext in KNOWLEDGE_EXTENSIONS:
+        all_files.extend(glob.glob(f"{knowledge_base_path}/**/*{ext}", recursive=True))
+    return sorted(all_files)
+
+def content_hash(content):
+    """SHA-256 of a document's text content"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def file_signature(file_path):
+    """Cheap change signature (size + mtime) used to skip re-hashing untouched files"""
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+# ============================================================================
+# INDEX MANIFEST
+# ============================================================================
+
+class IndexManifest:
+    """Record of which knowledge files are in the index, keyed by source path.
+
+    Each entry holds the content hash the file had when it was embedded, so a
+    restart only has to re-embed files whose hash no longer matches. `settings`
+    records how the index was built (chunk size etc.); if they differ from the
+    current settings the whole index must be rebuilt. `boilerplate` holds the
+    site-chrome lines learned when the index was first built, so files added
+    later are cleaned exactly like the rest. Without a path the manifest
+    lives in memory only (ephemeral index).
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.files = {}
+        self.settings = {}
+        self.boilerplate = []
+        self.load()
+
+    def load(self):
+        """Load manifest from disk; a missing or unreadable file means an empty index"""
+        self.files = {}
+        self.settings = {}
+        self.boilerplate = []
+        self.topics = []
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.files = data.get('files', {})
+            self.settings = data.get('settings', {})
+            self.boilerplate = data.get('boilerplate', [])
+            self.topics = data.get('topics', [])
+
+    def save(self):
+        """Write manifest atomically so a crash never leaves it half-written"""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'settings': self.settings,
+                'boilerplate': self.boilerplate,
+                'topics': self.topics,
+                'files': self.files
+            }, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, settings):
+        """Forget every file and start a fresh index built with `settings`"""
+        self.files = {}
+        self.settings = dict(settings)
+        self.boilerplate = []
+        self.topics = []
+
+    def get(self, source):
+        return self.files.get(source)
+
+    def set(self, source, entry):
+        self.files[source] = entry
+
+    def remove(self, source):
+        self.files.pop(source, None)
+
+    def sources(self):
+        return set(self.files)
+
+    def version(self):
+        """Short fingerprint of the indexed content; changes whenever any file or setting does"""
+        digest = hashlib.sha256(json.dumps(self.settings, sort_keys=True).encode('utf-8'))
+        for source in sorted(self.files):
+            digest.update(f"{source}\0{self.files[source].get('sha256', '')}\n".encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def is_current(self, source, sha256):
+        """Check if source is indexed with exactly this content"""
+        entry = self.files.get(source)
+        return entry is not None and entry.get('sha256') == sha256
+
+# ============================================================================
+# TOPIC CATALOG
+# ============================================================================
+
+def _humanize(slug):
+    return slug.replace('-', ' ').replace('_', ' ').strip().title()
+
+def topic_category(source, knowledge_base_path):
+    """Category of a knowledge file: its subfolder, else its filename prefix
+
+    e.g. blog_what-is-opec.txt -> "Blog", trading-markets_indices.txt ->
+    "Trading Markets"; files without a prefix fall under "General".
+    """
+    relative = os.path.relpath(source, knowledge_base_path)
+    folder = os.path.dirname(relative)
+    if folder:
+        return _humanize(folder.split(os.sep)[0])
+    stem = os.path.splitext(os.path.basename(relative))[0]
+    if '_' in stem:
+        return _humanize(stem.split('_', 1)[0])
+    return GENERAL_CATEGORY
+
+def topic_title(source):
+    """Readable topic name from a file name, without its category prefix"""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return _humanize(stem.split('_', 1)[1] if '_' in stem else stem)
+
+def build_topic_catalog(sources, knowledge_base_path, topics_per_category=TOPICS_PER_CATEGORY):
+    """Group indexed files into categories, largest category first.
+
+    Returns a list of {'category', 'count', 'topics'} dicts, where topics
+    holds up to topics_per_category example titles.
+    """
+    groups = {}
+    for source in sorted(sources):
+        groups.setdefault(topic_category(source, knowledge_base_path), []).append(topic_title(source))
+    catalog = [
+        {'category': category, 'count': len(titles), 'topics': titles[:topics_per_category]}
+        for category, titles in groups.items()
+    ]
+    catalog.sort(key=lambda entry: (-entry['count'], entry['category']))
+    return catalog
+
+def format_topic_catalog(catalog):
+    """Catalog as markdown lines: "**Category:** topic, topic, ..." """
+    return [f"**{entry['category']}:** {', '.join(entry['topics'])}" for entry in catalog]
+
+# ============================================================================
+# INCREMENTAL SYNC
+# ============================================================================
+
+class SyncPlan:
+    """Diff between the knowledge base folder and the index manifest"""
+
+    def __init__(self):
+        self.added = []
+        self.updated = []
+        self.removed = []
+        self.unchanged = []
+        self.contents = {}  # source -> text, only for files that need embedding
+        self.entries = {}   # source -> new manifest entry for every present file
+
+    @property
+    def to_embed(self):
+        return self.added + self.updated
+
+    def has_changes(self):
+        return bool(self.added or self.updated or self.removed)
+
+def plan_sync(knowledge_base_path, manifest, read_file, max_workers=1):
+    """Work out which files to embed, delete or skip.
+
+    A file whose size and mtime match its manifest entry is skipped without
+    being read. Otherwise it is read and hashed; if the hash still matches
+    (e.g. the file was only touched) it counts as unchanged and just gets its
+    new signature recorded. With max_workers > 1 the files that need reading
+    are read (and hashed) in a thread pool; read_file must be thread-safe.
+    read_file returns None when a file can't be read: an indexed file then
+    keeps its manifest entry and passages until it can be read again, while
+    an empty file counts as removed.
+    """
+    plan = SyncPlan()
+    present = set()
+    to_read = []
+
+    for file_path in list_knowledge_files(knowledge_base_path):
+        try:
+            signature = file_signature(file_path)
+        except OSError:
+            continue
+        entry = manifest.get(file_path)
+
+        if entry and all(entry.get(k) == v for k, v in signature.items()):
+            present.add(file_path)
+            plan.unchanged.append(file_path)
+            plan.entries[file_path] = entry
+            continue
+        to_read.append((file_path, signature, entry))
+
+    def read_and_hash(item):
+        content = read_file(item[0])
+        if content is None or len(content.strip()) <= MIN_CONTENT_LENGTH:
+            return content, None
+        return content, content_hash(content)
+
+    if max_workers > 1 and len(to_read) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(read_and_hash, to_read))
+    else:
+        results = [read_and_hash(item) for item in to_read]
+
+    for (file_path, signature, entry), (content, sha256) in zip(to_read, results):
+        if content is None:
+            # Unreadable for now (permissions, encoding...): keep what is indexed
+            if entry is not None:
+                present.add(file_path)
+                plan.unchanged.append(file_path)
+                plan.entries[file_path] = entry
+            continue
+        if sha256 is None:
+            continue
+
+        present.add(file_path)
+        plan.entries[file_path] = {'sha256': sha256, **signature}
+
+        if entry is None:
+            plan.added.append(file_path)
+            plan.contents[file_path] = content
+        elif entry.get('sha256') != sha256:
+            plan.updated.append(file_path)
+            plan.contents[file_path] = content
+        else:
+            plan.unchanged.append(file_path)
+
+    plan.removed = sorted(manifest.sources() - present)
+    return plan
+
+def new_sync_report():
+    """Empty sync report: per-bucket file counts plus stage timings in seconds"""
+    return {
+        'added': 0,
+        'updated': 0,
+        'removed': 0,
+        'unchanged': 0,
+        'chunks': 0,
+        'errors': [],
+        'timings': {'scan': 0.0, 'delete': 0.0, 'chunk': 0.0, 'embed': 0.0, 'total': 0.0},
+        'started_at': time.time()
+    }
+
+def format_sync_report(report):
+    """One-line human summary of a sync report"""
+    return (
+        f"{report['added']} added, {report['updated']} updated, "
+        f"{report['removed']} removed, {report['unchanged']} unchanged "
+        f"({report['chunks']} passages embedded) "
+        f"in {report['timings']['total']:.2f}s (embed {report['timings']['embed']:.2f}s"
+        + (f", {report['throughput']['embed_chunks_per_s']:.0f} passages/s" if report.get('chunks') else "")
+        + ")"
+    )
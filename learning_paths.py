@@ -0,0 +1,93 @@
+"""
+Hantec AI Mentor - Learning Plans & Next Actions (loaded once, immutable)
+"""
+
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+# Learning plans per conversation path and next actions per onboarding step
+LEARNING_PATHS_FILE = os.environ.get("HANTEC_LEARNING_PATHS", os.path.join("data", "learning_paths.json"))
+FRAGMENT_CACHE_SIZE = 256
+
+# Tuples: immutable and without a per-instance __dict__
+LearningModule = namedtuple('LearningModule', ['week', 'topics', 'time', 'action'])
+LearningPlan = namedtuple('LearningPlan', ['title', 'duration', 'modules', 'resources', 'tips'])
+NextAction = namedtuple('NextAction', ['title', 'description', 'why', 'time', 'link'])
+PageFragments = namedtuple('PageFragments', ['plan_header', 'module_bodies', 'tips', 'next_action'])
+LearningPaths = namedtuple('LearningPaths', ['plans', 'actions', 'default_path', 'default_step'])
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def _build_plan(raw):
+    return LearningPlan(
+        title=raw['title'],
+        duration=raw['duration'],
+        modules=tuple(
+            LearningModule(module['week'], tuple(module['topics']), module['time'], module['action'])
+            for module in raw['modules']
+        ),
+        resources=tuple(raw['resources']),
+        tips=tuple(raw['tips'])
+    )
+
+def load_learning_paths(path=LEARNING_PATHS_FILE):
+    """Parse a learning-paths file into read-only plan and action tables"""
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    plans = {name: _build_plan(plan) for name, plan in raw['learning_plans'].items()}
+    actions = {step: NextAction(**action) for step, action in raw['next_actions'].items()}
+    if raw['default_path'] not in plans or raw['default_step'] not in actions:
+        raise ValueError(f"{path}: default_path and default_step must name an existing plan and action")
+    return LearningPaths(MappingProxyType(plans), MappingProxyType(actions), raw['default_path'], raw['default_step'])
+
+@lru_cache(maxsize=None)
+def get_learning_paths():
+    """The tables from LEARNING_PATHS_FILE, loaded on first use"""
+    return load_learning_paths()
+
+# ============================================================================
+# LOOKUP
+# ============================================================================
+
+def learning_plan(path):
+    """Plan for a conversation path (the default path's for unknown ones)"""
+    tables = get_learning_paths()
+    return tables.plans.get(path) or tables.plans[tables.default_path]
+
+def next_action(step):
+    """Next action for an onboarding step (the first step's for unknown ones)"""
+    tables = get_learning_paths()
+    return tables.actions.get(step) or tables.actions[tables.default_step]
+
+# ============================================================================
+# MARKDOWN FRAGMENTS
+# ============================================================================
+
+@lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def page_fragments(path, step):
+    """Markdown for the profile summary page of a (path, step), rendered once"""
+    plan = learning_plan(path)
+    action = next_action(step)
+    module_bodies = tuple(
+        f"**⏰ Time Commitment:** {module.time}\n\n<br>\n\n"
+        "**📚 What You'll Learn:**\n\n"
+        + "\n".join(f"- {topic}" for topic in module.topics)
+        + f"\n\n<br>\n\n{module.action}"
+        for module in plan.modules
+    )
+    return PageFragments(
+        plan_header=f"## {plan.title}\n\n**⏱️ Estimated Duration:** {plan.duration}",
+        module_bodies=module_bodies,
+        tips="\n\n".join(plan.tips),
+        next_action=(
+            f"### {action.title}\n\n"
+            f"**What:** {action.description}\n\n"
+            f"**Why:** {action.why}\n\n"
+            f"**Time:** {action.time}"
+        )
+    )
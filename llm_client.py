@@ -0,0 +1,167 @@
+"""
+Hantec AI Mentor - OpenAI Client Pool & Chat Helpers
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+# openai and httpx are imported on first use: they take a noticeable share
+# of app startup and the welcome screen doesn't need them
+
+# Request timeout (seconds) for the whole call and for establishing a connection
+REQUEST_TIMEOUT = float(os.environ.get("HANTEC_OPENAI_TIMEOUT", "30"))
+CONNECT_TIMEOUT = float(os.environ.get("HANTEC_OPENAI_CONNECT_TIMEOUT", "5"))
+MAX_RETRIES = int(os.environ.get("HANTEC_OPENAI_MAX_RETRIES", "2"))
+
+# Connection pool per API key
+MAX_CONNECTIONS = int(os.environ.get("HANTEC_OPENAI_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 60.0  # seconds an idle connection is kept open
+
+# Users can bring their own keys, so cap how many pools we keep around
+MAX_CLIENTS = 32
+
+logger = logging.getLogger(__name__)
+
+# key id -> (client, event loop an async client is bound to, or None)
+_clients = OrderedDict()
+_async_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+# ============================================================================
+# CLIENT REGISTRY
+# ============================================================================
+
+def _key_id(api_key):
+    """Registry key for an API key, so raw keys are not used as dict keys"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+def preload():
+    """Import the OpenAI SDK now (e.g. from a warm-up thread) instead of on the first request"""
+    import httpx
+    import openai
+    return openai, httpx
+
+def _build_client(api_key):
+    """OpenAI client with a bounded keep-alive connection pool"""
+    import httpx
+    from openai import DefaultHttpxClient, OpenAI
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+    )
+    return OpenAI(
+        api_key=api_key,
+        http_client=http_client,
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+        max_retries=MAX_RETRIES
+    )
+
+def _build_async_client(api_key):
+    """AsyncOpenAI client with the same pool limits and timeouts as _build_client"""
+    import httpx
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+    )
+    return AsyncOpenAI(
+        api_key=api_key,
+        http_client=http_client,
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+        max_retries=MAX_RETRIES
+    )
+
+def _close_client(client, loop):
+    """Close a client's connection pool; an async client's on the loop that owns it"""
+    try:
+        if loop is None:
+            client.close()
+        elif not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.close(), loop)
+    except Exception as e:
+        logger.warning(f"Error closing OpenAI client: {e}")
+
+def _get_pooled(registry, api_key, build, loop=None):
+    key_id = _key_id(api_key)
+    evicted = []
+    with _clients_lock:
+        entry = registry.get(key_id)
+        if entry is None:
+            entry = (build(api_key), loop)
+            registry[key_id] = entry
+            while len(registry) > MAX_CLIENTS:
+                evicted.append(registry.popitem(last=False)[1])
+        else:
+            registry.move_to_end(key_id)
+    for client, client_loop in evicted:
+        _close_client(client, client_loop)
+    return entry[0]
+
+def get_openai_client(api_key):
+    """Shared OpenAI client for api_key.
+
+    Clients are created once per key and reused across messages, sessions
+    and modules, so their connections (and TLS sessions) stay warm. The
+    least recently used client is dropped once MAX_CLIENTS keys are held.
+    """
+    return _get_pooled(_clients, api_key, _build_client)
+
+def get_async_openai_client(api_key):
+    """Shared AsyncOpenAI client for api_key.
+
+    An async client's connection pool is bound to the event loop it first
+    ran on, so only use these from the background loop in async_runner
+    (or the server's loop). Call from a coroutine on that loop: it is
+    recorded so the client can be closed there when evicted.
+    """
+    return _get_pooled(_async_clients, api_key, _build_async_client, asyncio.get_running_loop())
+
+def clear_clients():
+    """Close and forget every pooled client"""
+    with _clients_lock:
+        entries = list(_clients.values()) + list(_async_clients.values())
+        _clients.clear()
+        _async_clients.clear()
+    for client, loop in entries:
+        _close_client(client, loop)
+
+# ============================================================================
+# STREAMING
+# ============================================================================
+
+def stream_chat_completion(client, **kwargs):
+    """Yield the text deltas of a streamed chat completion as they arrive"""
+    stream = client.chat.completions.create(stream=True, **kwargs)
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+async def astream_chat_completion(client, **kwargs):
+    """Async version of stream_chat_completion for an AsyncOpenAI client"""
+    stream = await client.chat.completions.create(stream=True, **kwargs)
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    finally:
+        # Closing the response aborts the HTTP stream when we are cancelled
+        await stream.close()
@@ -0,0 +1,779 @@
+"""
+Hantec AI Mentor - Core (RAG index, prompts, message pipeline) with no UI dependencies
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from knowledge_base import (
+    IndexManifest, MANIFEST_FILENAME, build_topic_catalog, format_topic_catalog,
+    new_sync_report, plan_sync
+)
+from answer_cache import is_cacheable_query, profile_hash
+from async_runner import StreamHandle
+from context_builder import build_context, estimate_tokens
+from conversation_memory import format_source_footer, model_message
+from embedding_store import EmbeddingStore, InMemoryPassageStore, is_current_snapshot, write_snapshot
+from ingestion import DEFAULT_EMBED_BATCH_SIZE, DEFAULT_IO_WORKERS, chunk_files, iter_embedding_batches, throughput
+from llm_client import astream_chat_completion, get_async_openai_client, preload as preload_llm_client
+from retrieval import (
+    DEFAULT_MAX_DISTANCE, DEFAULT_MIN_LEXICAL_SCORE, LEXICAL_INDEX_FILENAME, LexicalIndex, QueryEmbeddingCache,
+    ScoreHistogram, cosine_distance, filter_relevant, reciprocal_rank_fusion
+)
+from vector_backends import VECTOR_BACKENDS, ChromaVectorBackend, NumpyVectorBackend
+from text_processing import CLEANING_VERSION, DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, find_boilerplate_lines
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+KNOWLEDGE_BASE_PATH = os.environ.get("HANTEC_KNOWLEDGE_BASE", "data/knowledge_base")
+# On-disk index location; set HANTEC_INDEX_DIR="" for an in-memory index
+INDEX_DIR = os.environ.get("HANTEC_INDEX_DIR", "data/index")
+# Input tokens per request (system prompt + knowledge + chat history)
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("HANTEC_CONTEXT_TOKENS", "3000"))
+RETRIEVAL_CANDIDATES = 8
+# Chat messages (newest) handed to build_context, which trims them to budget
+HISTORY_MESSAGES = 10
+# Cosine distance above which a passage counts as off-topic
+MAX_DISTANCE = float(os.environ.get("HANTEC_MAX_DISTANCE", DEFAULT_MAX_DISTANCE))
+# HANTEC_SERVING_INDEX=1: serve the memory-mapped snapshot of INDEX_DIR
+# read-only instead of opening ChromaDB (for running many worker processes).
+# Workers keep the snapshot they opened; restart them to serve a newer one
+SERVING_INDEX = os.environ.get("HANTEC_SERVING_INDEX", "") == "1"
+# float16 halves the snapshot's size at a small cost in score precision
+EMBEDDING_DTYPE = os.environ.get("HANTEC_EMBEDDING_DTYPE", "float32")
+# Vector search: "chroma" (HNSW) or "numpy" (exact brute force). Serving
+# indexes always use numpy
+VECTOR_BACKEND = os.environ.get("HANTEC_VECTOR_BACKEND", "chroma")
+# Check a serving snapshot's checksums before loading it ("0" skips it)
+VERIFY_INDEX = os.environ.get("HANTEC_VERIFY_INDEX", "1") != "0"
+# Model behind chromadb's DefaultEmbeddingFunction; recorded in snapshots
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Sync/rebuild parallelism: processes embedding passages (1 = in-process,
+# where ONNX Runtime already uses every core), passages per embedding batch,
+# and threads reading and chunking files
+EMBED_WORKERS = int(os.environ.get("HANTEC_EMBED_WORKERS", "1"))
+EMBED_BATCH_SIZE = int(os.environ.get("HANTEC_EMBED_BATCH_SIZE", DEFAULT_EMBED_BATCH_SIZE))
+IO_WORKERS = int(os.environ.get("HANTEC_IO_WORKERS", DEFAULT_IO_WORKERS))
+
+def create_rag_system(sync=True, serving=SERVING_INDEX):
+    """HantecRAG configured from the environment (HANTEC_* variables)"""
+    return HantecRAG(
+        persist_directory=INDEX_DIR or None,
+        max_distance=MAX_DISTANCE,
+        sync_on_start=sync,
+        serving=serving,
+        embedding_dtype=EMBEDDING_DTYPE,
+        vector_backend=VECTOR_BACKEND,
+        verify_index=VERIFY_INDEX,
+        embed_workers=EMBED_WORKERS,
+        embed_batch_size=EMBED_BATCH_SIZE,
+        io_workers=IO_WORKERS
+    )
+
+class RagSystemLoader:
+    """Builds and warms up a RAG system in a daemon thread.
+
+    Creating HantecRAG imports chromadb, loads the ONNX embedding model and
+    syncs the index; starting that in the background lets the UI paint
+    first. get() blocks until it is done and re-raises any error.
+    """
+
+    def __init__(self, factory=create_rag_system):
+        self.factory = factory
+        self.elapsed = None
+        self._done = threading.Event()
+        self._rag_system = None
+        self._error = None
+
+    def start(self):
+        threading.Thread(target=self._load, name="hantec-index-warmup", daemon=True).start()
+        return self
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            rag_system = self.factory()
+            rag_system.warm_up()
+            preload_llm_client()
+            self._rag_system = rag_system
+        except Exception as e:
+            logger.exception("RAG system initialization failed")
+            self._error = e
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def get(self, timeout=None):
+        """The RAG system, once loaded"""
+        if not self._done.wait(timeout):
+            raise TimeoutError("The knowledge base is still loading")
+        if self._error is not None:
+            raise self._error
+        return self._rag_system
+
+# ============================================================================
+# RAG SYSTEM
+# ============================================================================
+
+class HantecRAG:
+    def __init__(self, knowledge_base_path=KNOWLEDGE_BASE_PATH, persist_directory=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, chunk_overlap=DEFAULT_CHUNK_OVERLAP, hybrid=True,
+                 max_distance=DEFAULT_MAX_DISTANCE, min_lexical_score=DEFAULT_MIN_LEXICAL_SCORE,
+                 sync_on_start=True, serving=False, embedding_dtype="float32", vector_backend="chroma",
+                 verify_index=True, embed_workers=1, embed_batch_size=DEFAULT_EMBED_BATCH_SIZE,
+                 io_workers=DEFAULT_IO_WORKERS):
+        """Initialize ChromaDB and load knowledge
+
+        With a persist_directory the index and its manifest live on disk, so a
+        restart reopens the existing collection and only re-embeds files whose
+        content changed. Without one the index is in-memory (rebuilt each start).
+        Files are cleaned of site boilerplate and indexed as passages of about
+        chunk_size characters. Passages also go into a BM25 index kept next to
+        the collection; with hybrid=True retrieval fuses both rankings.
+        Retrieved passages further than max_distance (cosine) from the query
+        are dropped unless their BM25 score reaches min_lexical_score.
+        With sync_on_start=False an existing on-disk index is opened as is and
+        never written to. Every sync of an on-disk index also exports its
+        passages and embeddings (as embedding_dtype) to a memory-mapped
+        snapshot; with serving=True only that snapshot is opened - no
+        ChromaDB - so any number of worker processes share one copy of it.
+        vector_backend picks how nearest passages are found (see
+        vector_backends); a serving index is always searched with numpy.
+        A serving snapshot (or a pre-built one from build_index) is checked
+        against its checksums first unless verify_index is False.
+        A sync reads and chunks files on io_workers threads and embeds
+        passages embed_batch_size at a time, on embed_workers processes when
+        more than one (see ingestion), upserting each batch as it is ready.
+        """
+        self.knowledge_base_path = knowledge_base_path
+        self.persist_directory = persist_directory
+        self.serving = serving
+        self.embedding_dtype = embedding_dtype
+        self.collection = None
+        self.store = None
+        if vector_backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend {vector_backend!r} (use one of {VECTOR_BACKENDS})")
+        self.vector_backend_name = "numpy" if serving else vector_backend
+        self.vector_backend = None
+        self.embed_workers = max(1, embed_workers)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.io_workers = max(1, io_workers)
+        self.hybrid = hybrid
+        self.max_distance = max_distance
+        self.min_lexical_score = min_lexical_score
+        self.score_stats = {
+            'queries': 0,
+            'no_answer': 0,
+            'top_distance': ScoreHistogram(),
+            'all_distances': ScoreHistogram()
+        }
+        self._stats_lock = threading.Lock()
+        self.index_settings = {
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "cleaning": CLEANING_VERSION
+        }
+        os.makedirs(knowledge_base_path, exist_ok=True)
+        
+        try:
+            import chromadb
+            from chromadb.utils import embedding_functions
+            
+            if serving:
+                if not persist_directory:
+                    raise ValueError("Serving mode needs a persist_directory")
+                self.store = EmbeddingStore.open(persist_directory, verify=verify_index)
+                if self.store is None:
+                    raise RuntimeError(f"No serving snapshot in {persist_directory} - sync or build the index first")
+                # A snapshot carries its own manifest and BM25 index
+                manifest_path = (self.store.attachment(MANIFEST_FILENAME)
+                                 or os.path.join(persist_directory, MANIFEST_FILENAME))
+                lexical_path = (self.store.attachment(LEXICAL_INDEX_FILENAME)
+                                or os.path.join(persist_directory, LEXICAL_INDEX_FILENAME))
+            elif persist_directory:
+                os.makedirs(persist_directory, exist_ok=True)
+                self.client = chromadb.PersistentClient(path=persist_directory)
+                manifest_path = os.path.join(persist_directory, MANIFEST_FILENAME)
+                lexical_path = os.path.join(persist_directory, LEXICAL_INDEX_FILENAME)
+            else:
+                self.client = chromadb.EphemeralClient()
+                manifest_path = None
+                lexical_path = None
+            default_ef = embedding_functions.DefaultEmbeddingFunction()
+            self.embedding_function = default_ef
+            self.query_embeddings = QueryEmbeddingCache(default_ef)
+            
+            if not serving:
+                try:
+                    self.collection = self.client.get_collection(
+                        name="hantec_knowledge",
+                        embedding_function=default_ef
+                    )
+                except:
+                    self.collection = self.client.create_collection(
+                        name="hantec_knowledge",
+                        embedding_function=default_ef,
+                        metadata={"hnsw:space": "cosine"}
+                    )
+                self.embed_batch_size = min(self.embed_batch_size, self.client.get_max_batch_size())
+        except Exception:
+            logger.exception("ChromaDB initialization error")
+            raise
+        
+        self.manifest = IndexManifest(manifest_path)
+        self.lexical_index = LexicalIndex(lexical_path)
+        self._sync_lock = threading.Lock()
+        self.last_sync_report = None
+        self.index_version = self.manifest.version()
+        if serving:
+            self.index_version = self.store.index_version
+        elif sync_on_start:
+            self.sync()
+        if self.vector_backend is None:
+            self._open_vector_backend()
+        if not len(self.lexical_index) and self.passage_count():
+            # Kept in memory only - a read-only index is never written back
+            self._rebuild_lexical_index()
+    
+    def warm_up(self):
+        """Load the embedding model and page in the vector index before the first query"""
+        embedding = self.embedding_function(["warm-up"])[0]
+        if self.passage_count():
+            self.vector_backend.search([embedding], 1)
+    
+    def document_count(self):
+        """Number of knowledge files in the index"""
+        return len(self.manifest.files)
+    
+    def passage_count(self):
+        """Number of indexed passages"""
+        return self.vector_backend.count()
+    
+    def describe_vector_backend(self):
+        """Which vector search is in use and where it reads from, for display"""
+        if self.vector_backend.name == "chroma":
+            return f"ChromaDB ({'persistent' if self.persist_directory else 'in-memory'})"
+        source = "serving snapshot" if isinstance(self.store, EmbeddingStore) else "in-memory"
+        return f"NumPy exact search ({source})"
+    
+    def sync(self, rebuild=False, progress=None):
+        """Incrementally sync the index with the knowledge_base folder
+
+        Upserts new and edited files, deletes removed ones and skips unchanged
+        ones (see plan_sync). rebuild=True forgets the manifest first, forcing
+        every file to be re-embedded. progress(done, total) is called as
+        passages get embedded. Returns a report of counts, timings and
+        throughput.
+        """
+        with self._sync_lock:
+            report = new_sync_report()
+            start = time.perf_counter()
+            if self.serving:
+                report['errors'].append("This is a read-only serving index; sync it from a writer process")
+                self.last_sync_report = report
+                return report
+            
+            # An index built with other settings (or without a manifest) can't be
+            # patched incrementally, so start it over
+            fresh = rebuild or self.manifest.settings != self.index_settings or not self.manifest.files
+            if fresh:
+                self.manifest.reset(self.index_settings)
+                self.lexical_index.clear()
+                existing = self.collection.get(include=[])['ids']
+                if existing:
+                    self.collection.delete(ids=existing)
+            elif not len(self.lexical_index):
+                # Vector index present but its BM25 companion missing or outdated
+                self._rebuild_lexical_index()
+            
+            plan = plan_sync(
+                self.knowledge_base_path,
+                self.manifest,
+                lambda file_path: self._read_file(file_path, report['errors']),
+                max_workers=self.io_workers
+            )
+            
+            # Site chrome is learned from the whole corpus once, when the index
+            # is (re)built - on a fresh index every file is in plan.contents
+            if fresh:
+                self.manifest.boilerplate = find_boilerplate_lines(plan.contents.values())
+            report['unchanged'] = len(plan.unchanged)
+            report['timings']['scan'] = time.perf_counter() - start
+            
+            # Edited files lose their old chunks too - the chunk count may change
+            stale = plan.removed + plan.updated
+            if stale:
+                t0 = time.perf_counter()
+                try:
+                    for source in stale:
+                        self.collection.delete(where={"source": source})
+                        self.lexical_index.remove_source(source)
+                    for source in plan.removed:
+                        self.manifest.remove(source)
+                    report['removed'] = len(plan.removed)
+                except Exception as e:
+                    report['errors'].append(f"Error removing from ChromaDB: {str(e)}")
+                report['timings']['delete'] = time.perf_counter() - t0
+            
+            to_embed = plan.to_embed
+            if to_embed:
+                t0 = time.perf_counter()
+                documents, metadatas, ids = self._chunk_files(to_embed, plan.contents)
+                report['timings']['chunk'] = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                try:
+                    # Each batch is stored as soon as it is embedded, while
+                    # worker processes carry on with the next ones
+                    for batch_start, batch_end, embeddings in iter_embedding_batches(
+                        documents, self.embedding_function, self.embed_batch_size, self.embed_workers
+                    ):
+                        self.collection.upsert(
+                            documents=documents[batch_start:batch_end],
+                            metadatas=metadatas[batch_start:batch_end],
+                            embeddings=embeddings,
+                            ids=ids[batch_start:batch_end]
+                        )
+                        if progress:
+                            progress(batch_end, len(documents))
+                    for document, metadata, passage_id in zip(documents, metadatas, ids):
+                        self.lexical_index.add(passage_id, document, metadata["source"])
+                    report['added'] = len(plan.added)
+                    report['updated'] = len(plan.updated)
+                    report['chunks'] = len(ids)
+                except Exception as e:
+                    report['errors'].append(f"Error adding to ChromaDB: {str(e)}")
+                    to_embed = []
+                report['timings']['embed'] = time.perf_counter() - t0
+            
+            for source in plan.unchanged + to_embed:
+                self.manifest.set(source, plan.entries[source])
+            if fresh or plan.has_changes() or not self.manifest.topics:
+                self.manifest.topics = build_topic_catalog(self.manifest.sources(), self.knowledge_base_path)
+            self.manifest.save()
+            self.lexical_index.save()
+            self.index_version = self.manifest.version()
+            report['index_version'] = self.index_version
+            
+            if self.persist_directory and (
+                plan.has_changes() or fresh
+                or not is_current_snapshot(self.persist_directory, self.index_version, self.embedding_dtype)
+            ):
+                t0 = time.perf_counter()
+                try:
+                    self._export_snapshot()
+                except Exception as e:
+                    report['errors'].append(f"Error writing serving snapshot: {str(e)}")
+                report['timings']['snapshot'] = time.perf_counter() - t0
+            
+            if self.vector_backend is None or (self.vector_backend_name != "chroma" and (fresh or plan.has_changes())):
+                self._open_vector_backend()
+            
+            report['timings']['total'] = time.perf_counter() - start
+            report['throughput'] = throughput(len(to_embed), report['chunks'], report['timings'])
+            self.last_sync_report = report
+            
+            for error in report['errors']:
+                logger.warning(error)
+            
+            return report
+    
+    def _rebuild_lexical_index(self):
+        """Rebuild the BM25 index from the passages stored in the collection"""
+        self.lexical_index.clear()
+        if self.serving:
+            for row in range(len(self.store)):
+                passage = self.store.passage(row)
+                self.lexical_index.add(passage['id'], passage['text'], passage.get("source", ""))
+            return
+        stored = self.collection.get(include=["documents", "metadatas"])
+        for passage_id, document, metadata in zip(stored['ids'], stored['documents'], stored['metadatas']):
+            self.lexical_index.add(passage_id, document, metadata.get("source", ""))
+    
+    def _open_vector_backend(self):
+        """(Re)load the vector backend; numpy search reads the snapshot if there is a current one"""
+        if self.vector_backend_name == "chroma":
+            self.vector_backend = ChromaVectorBackend(self.collection)
+            return
+        if not self.serving:
+            self.store = None
+            if self.persist_directory and is_current_snapshot(
+                self.persist_directory, self.index_version, self.embedding_dtype
+            ):
+                self.store = EmbeddingStore.open(self.persist_directory)
+            if self.store is None:
+                stored = self.collection.get(include=["documents", "metadatas", "embeddings"])
+                self.store = InMemoryPassageStore(
+                    stored['ids'], stored['documents'], stored['metadatas'], stored['embeddings']
+                )
+        self.vector_backend = NumpyVectorBackend(self.store)
+    
+    def _export_snapshot(self):
+        """Write the collection to the memory-mapped serving snapshot"""
+        stored = self.collection.get(include=["documents", "metadatas", "embeddings"])
+        write_snapshot(
+            self.persist_directory,
+            stored['ids'],
+            stored['documents'],
+            stored['metadatas'],
+            stored['embeddings'],
+            self.index_version,
+            dtype=self.embedding_dtype,
+            attachments={
+                MANIFEST_FILENAME: self.manifest.path,
+                LEXICAL_INDEX_FILENAME: self.lexical_index.path
+            },
+            build_info={'builder': "sync", 'embedding_model': EMBEDDING_MODEL, 'settings': self.index_settings}
+        )
+    
+    def _chunk_files(self, sources, contents):
+        """Clean and split files into passages (see chunk_files)"""
+        return chunk_files(
+            sources,
+            contents,
+            self.manifest.boilerplate,
+            self.index_settings["chunk_size"],
+            self.index_settings["chunk_overlap"],
+            max_workers=self.io_workers
+        )
+    
+    def _read_file(self, file_path, errors):
+        """Read file content, or None if it can't be read (the failure is added to errors)"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except Exception as e:
+            errors.append(f"Error reading {file_path}: {e}")
+            return None
+    
+    def get_available_topics(self):
+        """Topic catalog lines for the fallback reply (from memory, no file access)"""
+        return format_topic_catalog(self.manifest.topics)
+    
+    def embed_query(self, query):
+        """Embedding vector for a query text (cached)"""
+        return self.query_embeddings.embed([query])[0]
+    
+    def embed_queries(self, queries):
+        """Embedding vectors for a batch of query texts; uncached ones are embedded in one call"""
+        return self.query_embeddings.embed(queries)
+    
+    def retrieve_passages(self, query, n_results=5, query_embedding=None, apply_cutoff=True):
+        """Retrieve the top-k passages as dicts (text, metadata, cosine distance), best first
+
+        Pass query_embedding when the query was already embedded to skip doing it again.
+        An empty list means nothing in the knowledge base is relevant enough.
+        """
+        embeddings = [query_embedding] if query_embedding is not None else None
+        results = self.retrieve_passages_batch(
+            [query], n_results=n_results, query_embeddings=embeddings, apply_cutoff=apply_cutoff
+        )
+        return results[0] if results else []
+    
+    def retrieve_passages_batch(self, queries, n_results=5, query_embeddings=None, apply_cutoff=True):
+        """Retrieve the top-k passages for each of several queries with one embedding
+        call and one index query; returns a list of passage lists, one per query
+
+        In hybrid mode twice as many candidates are taken from the vector and
+        BM25 indexes and merged with reciprocal rank fusion. With apply_cutoff
+        irrelevant passages are dropped (see filter_relevant); distances are
+        recorded in score_stats either way.
+        """
+        if not queries:
+            return []
+        try:
+            if query_embeddings is None:
+                query_embeddings = self.embed_queries(queries)
+            n_candidates = self.candidate_count(n_results)
+            vector_batch = self.vector_search(query_embeddings, n_candidates)
+            lexical_batch = self.lexical_search(queries, n_candidates) if self.hybrid else None
+            return self.merge_results(query_embeddings, vector_batch, lexical_batch, n_results, apply_cutoff)
+        except Exception:
+            logger.exception("Retrieval error")
+            return [[] for _ in queries]
+    
+    # The stages below are what retrieve_passages_batch runs in order; they are
+    # public so the async pipeline can overlap them (e.g. BM25 with embedding).
+    
+    def candidate_count(self, n_results):
+        """How many candidates each index contributes for n_results final passages"""
+        return n_results * 2 if self.hybrid else n_results
+    
+    def vector_search(self, query_embeddings, n_candidates):
+        """Nearest passages for each query embedding, as passage dicts with distances"""
+        return self.vector_backend.search(query_embeddings, n_candidates)
+    
+    def lexical_search(self, queries, n_candidates):
+        """BM25 hits for each query as (passage_id, score) lists"""
+        return [self.lexical_index.search(query, n_candidates) for query in queries]
+    
+    def merge_results(self, query_embeddings, vector_batch, lexical_batch, n_results, apply_cutoff=True):
+        """Fuse vector and BM25 candidates (if any), record scores and apply the cutoff"""
+        if lexical_batch is not None:
+            batch = self._fuse_lexical(query_embeddings, vector_batch, lexical_batch, n_results)
+        else:
+            batch = [passages[:n_results] for passages in vector_batch]
+        
+        self._record_scores(batch)
+        if apply_cutoff:
+            batch = [
+                filter_relevant(passages, self.max_distance, self.min_lexical_score)
+                for passages in batch
+            ]
+        return batch
+    
+    def _record_scores(self, batch):
+        """Add each query's passage distances to the score histograms"""
+        with self._stats_lock:
+            for passages in batch:
+                self.score_stats['queries'] += 1
+                distances = [p['distance'] for p in passages if 'distance' in p]
+                if not distances:
+                    continue
+                self.score_stats['top_distance'].add(min(distances))
+                for distance in distances:
+                    self.score_stats['all_distances'].add(distance)
+                if not filter_relevant(passages, self.max_distance, self.min_lexical_score):
+                    self.score_stats['no_answer'] += 1
+    
+    def get_score_stats(self):
+        """Snapshot of retrieval score statistics (histograms as dicts)"""
+        with self._stats_lock:
+            return {
+                'queries': self.score_stats['queries'],
+                'no_answer': self.score_stats['no_answer'],
+                'max_distance': self.max_distance,
+                'min_lexical_score': self.min_lexical_score,
+                'top_distance': self.score_stats['top_distance'].to_dict(),
+                'all_distances': self.score_stats['all_distances'].to_dict()
+            }
+    
+    def _fuse_lexical(self, query_embeddings, vector_batch, lexical_batch, n_results):
+        """Merge BM25 hits into vector results (RRF); passages only BM25 found are
+        fetched in one call and given their true cosine distance to the query
+        """
+        fused_batch = []
+        missing = set()
+        for vector_passages, lexical_hits in zip(vector_batch, lexical_batch):
+            fused = reciprocal_rank_fusion([
+                [p["id"] for p in vector_passages],
+                [passage_id for passage_id, _ in lexical_hits]
+            ])[:n_results]
+            fused_batch.append((fused, dict(lexical_hits)))
+            known = {p["id"] for p in vector_passages}
+            missing.update(passage_id for passage_id, _ in fused if passage_id not in known)
+        
+        fetched = self.vector_backend.fetch(missing) if missing else {}
+        
+        results = []
+        for (fused, lexical_scores), vector_passages, query_embedding in zip(fused_batch, vector_batch, query_embeddings):
+            by_id = {p["id"]: p for p in vector_passages}
+            passages = []
+            for passage_id, fused_score in fused:
+                if passage_id in by_id:
+                    passage = dict(by_id[passage_id])
+                elif passage_id in fetched:
+                    passage, embedding = fetched[passage_id]
+                    passage = {**passage, "distance": cosine_distance(query_embedding, embedding)}
+                else:
+                    continue
+                passage["score"] = fused_score
+                passage["lexical_score"] = lexical_scores.get(passage_id, 0.0)
+                passages.append(passage)
+            results.append(passages)
+        return results
+    
+    def retrieve(self, query, n_results=5):
+        """Retrieve the top-k most relevant passages as (joined text, source filenames)"""
+        passages = self.retrieve_passages(query, n_results=n_results)
+        retrieved_knowledge = "\n\n".join(p['text'] for p in passages)
+        sources = [p.get('filename', 'Unknown') for p in passages]
+        return retrieved_knowledge, sources
+
+# ============================================================================
+# AI FUNCTIONS
+# ============================================================================
+
+def build_system_prompt(user_context, retrieved_knowledge, sources, conversation_summary=""):
+    """Build system prompt with context"""
+    source_info = f"\n\nSources: {', '.join(sources)}" if sources else ""
+    summary_info = f"\n\nEARLIER IN THIS CONVERSATION:\n{conversation_summary}" if conversation_summary else ""
+    
+    return f"""You are the Hantec Markets AI Mentor, a conversational assistant guiding users through CFD trading.
+
+USER CONTEXT:
+- Name: {user_context.get('name', 'User')}
+- State: {user_context.get('state', 'unknown')}
+- Language: {user_context.get('language', 'English')}{summary_info}
+
+CRITICAL CONSTRAINTS:
+- NEVER mention guaranteed returns
+- NO financial advice - education only
+- ALWAYS include risk disclaimers for trading queries
+- NEVER INVENT INFORMATION - Only use facts from knowledge base
+- If knowledge base doesn't contain answer, say "I don't have specific information"
+
+RESPONSE STRUCTURE:
+- Keep answers SHORT (2-4 sentences max)
+- Use bullet points for lists
+- Use **bold** for emphasis
+- Include ⚠️ for warnings
+
+KNOWLEDGE BASE:
+{retrieved_knowledge if retrieved_knowledge else "No specific knowledge found - MUST redirect to support."}
+{source_info}
+
+MANDATORY DISCLAIMERS:
+- For trading queries: "⚠️ Trading involves risk. This is for educational purposes only."
+
+Company: hmarkets.com | Support: support@hmarkets.com
+
+Remember: NEVER GUESS OR INVENT INFORMATION.
+"""
+
+def process_message(user_input, api_key, rag_system, user_context, history=(), answer_cache=None, memory=None):
+    """Process user message and get AI response"""
+    return "".join(stream_message(user_input, api_key, rag_system, user_context, history, answer_cache, memory))
+
+def stream_message(user_input, api_key, rag_system, user_context, history=(), answer_cache=None, memory=None):
+    """Process user message, yielding the AI response as it is generated
+
+    Sync wrapper around astream_message for callers without an event loop:
+    the pipeline runs on the background loop and the returned StreamHandle
+    is iterated like a generator. Call cancel() on it (or stop iterating) to
+    abandon the request.
+    """
+    return StreamHandle(
+        astream_message(user_input, api_key, rag_system, user_context, history, answer_cache, memory)
+    )
+
+def build_fallback_response(rag_system):
+    """Reply for questions the knowledge base has nothing relevant on"""
+    available_topics = rag_system.get_available_topics()
+    topics_text = "\n".join([f"- {topic}" for topic in available_topics[:4]]) if available_topics else "various trading topics"
+    
+    return f"I don't have specific information about that in my knowledge base.\n\n**But I can help you with:**\n{topics_text}\n\nFor other questions, please contact **support@hmarkets.com** or use our live chat (24/5).\n\nWhat would you like to know?"
+
+def build_chat_messages(user_context, passages, history, conversation_summary=""):
+    """System prompt plus history that fit the token budget, and the sources used"""
+    # The fixed part of the prompt is measured with every candidate source
+    # listed (upper bound)
+    candidate_sources = list(dict.fromkeys(p.get('filename', 'Unknown') for p in passages))
+    reserved_tokens = estimate_tokens(
+        build_system_prompt(user_context, "", candidate_sources, conversation_summary)
+    )
+    context = build_context(
+        passages,
+        history,
+        reserved_tokens=reserved_tokens,
+        token_budget=CONTEXT_TOKEN_BUDGET
+    )
+    system_prompt = build_system_prompt(user_context, context['knowledge'], context['sources'], conversation_summary)
+    return [{"role": "system", "content": system_prompt}, *context['history']], context['sources']
+
+async def astream_message(user_input, api_key, rag_system, user_context, history, answer_cache=None, memory=None):
+    """Async message pipeline, yielding the AI response as it is generated
+
+    Query embedding and the BM25 search run concurrently (both in worker
+    threads); the semantic cache check and vector search follow once the
+    embedding is ready. The LLM call needs the retrieved context, so it
+    starts last and is streamed with the async client. The source
+    attribution footer is yielded last. Cancelling the task aborts whatever
+    stage is running, including the HTTP stream. history is the chat so
+    far, with or without user_input as its last message. With a memory
+    (ConversationMemory) the model gets its running summary plus the
+    unsummarized messages instead of the last HISTORY_MESSAGES; either way
+    source footers are stripped and each message is capped in tokens.
+    The answer cache is shared across sessions, so only the first message
+    of a conversation (no earlier turns or summary to lean on) goes
+    through it, scoped to the language and user context it was answered
+    for; every later turn gets the full prompt and skips the cache.
+    """
+    language = user_context.get('language', 'English')
+    if memory is not None:
+        history = memory.model_history(history)
+        conversation_summary = memory.summary
+    else:
+        history = [model_message(m) for m in list(history)[-HISTORY_MESSAGES:]]
+        conversation_summary = ""
+    if not history or history[-1].get('content') != user_input:
+        history = history + [{"role": "user", "content": user_input}]
+    if memory is None:
+        history = history[-HISTORY_MESSAGES:]
+    kb_version = rag_system.index_version
+    use_cache = (
+        answer_cache is not None and len(history) == 1 and not conversation_summary
+        and is_cacheable_query(user_input)
+    )
+    cache_scope = (language, profile_hash(user_context))
+    
+    if use_cache:
+        cached = answer_cache.lookup_exact(user_input, cache_scope, kb_version)
+        if cached is not None:
+            yield cached
+            return
+    
+    # RAG: Retrieve relevant knowledge from local files. Fetch more candidates
+    # than fit - build_context keeps the best ones within the token budget
+    n_candidates = rag_system.candidate_count(RETRIEVAL_CANDIDATES)
+    lexical_task = None
+    if rag_system.hybrid:
+        lexical_task = asyncio.create_task(
+            asyncio.to_thread(rag_system.lexical_search, [user_input], n_candidates)
+        )
+    try:
+        query_embedding = await asyncio.to_thread(rag_system.embed_query, user_input)
+        
+        if use_cache:
+            cached = answer_cache.lookup(query_embedding, cache_scope, kb_version)
+            if cached is not None:
+                yield cached
+                return
+        
+        vector_batch = await asyncio.to_thread(rag_system.vector_search, [query_embedding], n_candidates)
+        lexical_batch = await lexical_task if lexical_task else None
+    finally:
+        if lexical_task and not lexical_task.done():
+            lexical_task.cancel()
+    
+    passages = (await asyncio.to_thread(
+        rag_system.merge_results, [query_embedding], vector_batch, lexical_batch, RETRIEVAL_CANDIDATES
+    ))[0]
+    
+    # Nothing passed the relevance cutoff: answer without calling the LLM
+    retrieved_knowledge = "\n\n".join(p['text'] for p in passages)
+    if not retrieved_knowledge or len(retrieved_knowledge.strip()) < 50:
+        yield build_fallback_response(rag_system)
+        return
+    
+    messages, all_sources = build_chat_messages(user_context, passages, history, conversation_summary)
+    
+    answer = []
+    async for token in astream_chat_completion(
+        get_async_openai_client(api_key),
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=0.1,
+        max_tokens=500
+    ):
+        answer.append(token)
+        yield token
+    
+    # Add source attribution at the bottom
+    if all_sources:
+        source_text = format_source_footer(all_sources)
+        answer.append(source_text)
+        yield source_text
+    
+    if use_cache:
+        answer_cache.store(user_input, query_embedding, cache_scope, kb_version, "".join(answer))
@@ -0,0 +1,137 @@
+"""
+Hantec AI Mentor - Profiling Decision Tree (compiled from a config file)
+
+The question graph lives in data/profiling_tree.json:
+
+    {"start": "age", "end": "profiling_complete", "questions": {
+        "trading_experience": {
+            "question": "...", "options": ["Complete Beginner", "Some Knowledge", "Experienced"],
+            "branches": [{"when": {"trading_experience": ["Experienced"]},
+                          "assume": {"traded_before": "Yes"}, "next": "investment_goal"}],
+            "next": "traded_before"},
+        ...}}
+
+An answer is stored in the question's profile field ("field", default the
+stage name). The first branch whose "when" matches the profile (every field
+holding one of the listed values) picks the next stage and fills in the
+"assume" answers for the questions it skips; otherwise "next" is taken.
+Pointing "next" at the end stage exits early.
+"""
+
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+PROFILING_TREE_FILE = os.environ.get("HANTEC_PROFILING_TREE", os.path.join("data", "profiling_tree.json"))
+
+Question = namedtuple('Question', ['stage', 'field', 'question', 'options', 'branches', 'next'])
+Branch = namedtuple('Branch', ['conditions', 'assume', 'next'])
+
+class ProfilingTree:
+    """Validated, precompiled profiling question graph.
+
+    Branch conditions are compiled to (field, frozenset of values) pairs and
+    the longest number of questions left from every stage is computed once,
+    so answering and progress lookups never walk the graph.
+    """
+
+    def __init__(self, config):
+        self.start = config['start']
+        self.end = config['end']
+        self._questions = {}
+        for stage, raw in config['questions'].items():
+            self._questions[stage] = Question(
+                stage=stage,
+                field=raw.get('field', stage),
+                question=raw['question'],
+                options=tuple(raw['options']),
+                branches=tuple(
+                    Branch(
+                        conditions=tuple(
+                            (field, frozenset([values] if isinstance(values, str) else values))
+                            for field, values in branch['when'].items()
+                        ),
+                        assume=tuple(branch.get('assume', {}).items()),
+                        next=branch['next']
+                    )
+                    for branch in raw.get('branches', ())
+                ),
+                next=raw['next']
+            )
+        self.fields = tuple(dict.fromkeys(
+            field
+            for question in self._questions.values()
+            for field in (question.field, *(f for b in question.branches for f, _ in b.assume))
+        ))
+        self._validate()
+        self._remaining = {}
+        for stage in self._questions:
+            self._longest_remaining(stage, ())
+
+    @classmethod
+    def load(cls, path=PROFILING_TREE_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _validate(self):
+        if self.start not in self._questions:
+            raise ValueError(f"Start stage {self.start!r} is not a question")
+        if self.end in self._questions:
+            raise ValueError(f"End stage {self.end!r} cannot be a question")
+        for question in self._questions.values():
+            if not question.options:
+                raise ValueError(f"Question {question.stage!r} has no options")
+            for target in (question.next, *(branch.next for branch in question.branches)):
+                if target != self.end and target not in self._questions:
+                    raise ValueError(f"Question {question.stage!r} leads to unknown stage {target!r}")
+
+    def _longest_remaining(self, stage, visiting):
+        """Questions left on the longest route from stage to the end (stage included)"""
+        if stage == self.end:
+            return 0
+        if stage in self._remaining:
+            return self._remaining[stage]
+        if stage in visiting:
+            raise ValueError(f"Profiling questions loop back to {stage!r}")
+        question = self._questions[stage]
+        targets = (question.next, *(branch.next for branch in question.branches))
+        longest = 1 + max(self._longest_remaining(target, visiting + (stage,)) for target in targets)
+        self._remaining[stage] = longest
+        return longest
+
+    def question(self, stage):
+        """Question at stage, or None (e.g. at the end)"""
+        return self._questions.get(stage)
+
+    def answer(self, stage, option, profile):
+        """Answer stage's question with option; returns (next stage, profile updates).
+
+        profile is not modified; branch conditions see it with the answer applied.
+        """
+        question = self._questions[stage]
+        updates = {question.field: option}
+        answered = {**profile, **updates}
+        for branch in question.branches:
+            if all(answered.get(field) in values for field, values in branch.conditions):
+                updates.update(branch.assume)
+                return branch.next, updates
+        return question.next, updates
+
+    def is_complete(self, stage):
+        return stage == self.end
+
+    def progress(self, stage, answered):
+        """(current question number, expected total) after answering `answered` questions.
+
+        The total assumes the longest route from here, so it only shrinks
+        when a branch skips questions.
+        """
+        if stage == self.end:
+            return answered, answered
+        return answered + 1, answered + self._remaining.get(stage, 1)
+
+@lru_cache(maxsize=None)
+def get_profiling_tree():
+    """The tree from PROFILING_TREE_FILE, compiled on first use"""
+    return ProfilingTree.load()
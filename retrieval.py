@@ -0,0 +1,323 @@
+"""
+Hantec AI Mentor - Retrieval Helpers (query embedding cache, BM25, rank fusion, relevance gating)
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+DEFAULT_EMBEDDING_CACHE_SIZE = 2048
+
+LEXICAL_INDEX_FILENAME = "lexical_index.json"
+LEXICAL_INDEX_VERSION = 1
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # Reciprocal rank fusion damping constant
+
+# Passages further than this (cosine distance) from the query are off-topic,
+# unless their BM25 score shows a strong exact-term match
+DEFAULT_MAX_DISTANCE = 0.75
+DEFAULT_MIN_LEXICAL_SCORE = 10.0
+HISTOGRAM_BIN_WIDTH = 0.05
+
+# Keeps trading symbols together: "eur/usd", "$10.00", "mt5", "s&p"
+_TOKEN = re.compile(r"[$€£]?[a-z0-9]+(?:[/.&'-][a-z0-9]+)*")
+_TOKEN_PART = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it its me my of on or
+our that the their this to was what when where which who why will with you your
+""".split())
+
+# ============================================================================
+# QUERY EMBEDDING CACHE
+# ============================================================================
+
+class QueryEmbeddingCache:
+    """LRU cache of query embedding vectors in front of an embedding function.
+
+    embed() takes a batch of texts, serves repeats from the cache and sends
+    all misses to the embedding function in a single call.
+    """
+
+    def __init__(self, embedding_function, max_entries=DEFAULT_EMBEDDING_CACHE_SIZE):
+        self.embedding_function = embedding_function
+        self.max_entries = max_entries
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'batches': 0}
+
+    @staticmethod
+    def _key(text):
+        return " ".join(text.split())
+
+    def embed(self, texts):
+        """Embedding vectors for texts, in order"""
+        keys = [self._key(text) for text in texts]
+        vectors = {}
+        with self._lock:
+            for key in keys:
+                if key in self._vectors:
+                    self._vectors.move_to_end(key)
+                    vectors[key] = self._vectors[key]
+            self.stats['hits'] += sum(1 for key in keys if key in vectors)
+
+        missing = list(dict.fromkeys(key for key in keys if key not in vectors))
+        if missing:
+            embedded = self.embedding_function(missing)
+            with self._lock:
+                self.stats['misses'] += len(missing)
+                self.stats['batches'] += 1
+                for key, vector in zip(missing, embedded):
+                    vectors[key] = vector
+                    self._vectors[key] = vector
+                while len(self._vectors) > self.max_entries:
+                    self._vectors.popitem(last=False)
+
+        return [vectors[key] for key in keys]
+
+    def get_stats(self):
+        with self._lock:
+            return {**self.stats, 'size': len(self._vectors)}
+
+# ============================================================================
+# LEXICAL (BM25) INDEX
+# ============================================================================
+
+def tokenize(text):
+    """Lowercased terms for BM25; compound symbols also index their parts"""
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(
+                part for part in _TOKEN_PART.findall(token)
+                if part != token and part not in STOPWORDS
+            )
+    return tokens
+
+class LexicalIndex:
+    """Incremental BM25 inverted index over passages.
+
+    Passages are interned to integer slots; postings map each term to
+    {slot: term frequency}, so a query only touches the postings of its own
+    terms. Removed passages leave a tombstone slot that is compacted away
+    when the index is saved. Without a path the index lives in memory only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.RLock()
+        self.clear()
+        self.load()
+
+    def clear(self):
+        """Forget every passage"""
+        with self._lock:
+            self._ids = []          # slot -> passage id (None once removed)
+            self._lengths = []      # slot -> number of terms
+            self._sources = []      # slot -> source file
+            self._terms = []        # slot -> distinct terms (forward index, for removal)
+            self._slots = {}        # passage id -> slot
+            self._by_source = {}    # source -> set of slots
+            self._postings = {}     # term -> {slot: tf}
+            self._total_length = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, passage_id, text, source):
+        """Index one passage (replacing any passage with the same id)"""
+        with self._lock:
+            if passage_id in self._slots:
+                self._remove_slot(self._slots[passage_id])
+            terms = Counter(tokenize(text))
+            slot = len(self._ids)
+            self._ids.append(passage_id)
+            self._lengths.append(sum(terms.values()))
+            self._sources.append(source)
+            self._terms.append(tuple(terms))
+            self._slots[passage_id] = slot
+            self._by_source.setdefault(source, set()).add(slot)
+            self._total_length += self._lengths[slot]
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[slot] = tf
+
+    def remove_source(self, source):
+        """Drop every passage that came from source"""
+        with self._lock:
+            for slot in self._by_source.pop(source, set()):
+                self._remove_slot(slot)
+
+    def _remove_slot(self, slot):
+        passage_id = self._ids[slot]
+        if passage_id is None:
+            return
+        self._by_source.get(self._sources[slot], set()).discard(slot)
+        for term in self._terms[slot]:
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+        del self._slots[passage_id]
+        self._ids[slot] = None
+        self._terms[slot] = ()
+        self._total_length -= self._lengths[slot]
+        self._lengths[slot] = 0
+
+    def search(self, query, n_results=10):
+        """Top passages for query as (passage_id, bm25_score), best first"""
+        with self._lock:
+            n_docs = len(self._slots)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for slot, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[slot] / avg_length)
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            best = heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+            return [(self._ids[slot], score) for slot, score in best]
+
+    def load(self):
+        """Load the index from disk; a missing or unreadable file means an empty index"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != LEXICAL_INDEX_VERSION:
+            return
+        with self._lock:
+            self.clear()
+            self._ids = data['ids']
+            self._lengths = data['lengths']
+            self._slots = {passage_id: slot for slot, passage_id in enumerate(self._ids)}
+            self._by_source = {source: set(slots) for source, slots in data['sources'].items()}
+            self._sources = [None] * len(self._ids)
+            for source, slots in self._by_source.items():
+                for slot in slots:
+                    self._sources[slot] = source
+            self._postings = {
+                term: dict(zip(postings[0::2], postings[1::2]))
+                for term, postings in data['postings'].items()
+            }
+            terms = [[] for _ in self._ids]
+            for term, postings in self._postings.items():
+                for slot in postings:
+                    terms[slot].append(term)
+            self._terms = [tuple(t) for t in terms]
+            self._total_length = sum(self._lengths)
+
+    def save(self):
+        """Write the index compacted (no tombstones), postings as flat [slot, tf, ...] lists"""
+        if not self.path:
+            return
+        with self._lock:
+            live = [slot for slot, passage_id in enumerate(self._ids) if passage_id is not None]
+            renumber = {slot: new for new, slot in enumerate(live)}
+            data = {
+                'version': LEXICAL_INDEX_VERSION,
+                'ids': [self._ids[slot] for slot in live],
+                'lengths': [self._lengths[slot] for slot in live],
+                'sources': {
+                    source: sorted(renumber[slot] for slot in slots)
+                    for source, slots in self._by_source.items() if slots
+                },
+                'postings': {
+                    term: [n for slot, tf in sorted(postings.items()) for n in (renumber[slot], tf)]
+                    for term, postings in self._postings.items()
+                }
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+# ============================================================================
+# RANK FUSION
+# ============================================================================
+
+def cosine_distance(a, b):
+    """1 - cosine similarity, matching Chroma's "cosine" space"""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return 1.0 - float(a @ b) / norm if norm else 1.0
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse several best-first lists of ids into one, scored by sum of 1 / (k + rank)"""
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, 1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+# ============================================================================
+# RELEVANCE GATING
+# ============================================================================
+
+def filter_relevant(passages, max_distance=DEFAULT_MAX_DISTANCE, min_lexical_score=DEFAULT_MIN_LEXICAL_SCORE):
+    """Passages close enough to the query (or strong BM25 matches), order kept"""
+    return [
+        p for p in passages
+        if p.get('distance', 0.0) <= max_distance
+        or (min_lexical_score is not None and p.get('lexical_score', 0.0) >= min_lexical_score)
+    ]
+
+class ScoreHistogram:
+    """Fixed-width histogram of cosine distances (0 to 2) for tuning the cutoff"""
+
+    def __init__(self, bin_width=HISTOGRAM_BIN_WIDTH, max_value=2.0):
+        self.bin_width = bin_width
+        self.counts = [0] * int(round(max_value / bin_width))
+        self.total = 0
+
+    def add(self, value):
+        index = min(max(int(value / self.bin_width), 0), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.total += 1
+
+    def percentile(self, p):
+        """Upper edge of the bin holding the p-th percentile, or None if empty"""
+        if not self.total:
+            return None
+        target = self.total * p / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return round((index + 1) * self.bin_width, 4)
+        return round(len(self.counts) * self.bin_width, 4)
+
+    def bins(self):
+        """Non-empty bins as (lower, upper, count)"""
+        return [
+            (i * self.bin_width, (i + 1) * self.bin_width, count)
+            for i, count in enumerate(self.counts) if count
+        ]
+
+    def to_dict(self):
+        return {
+            'bin_width': self.bin_width,
+            'total': self.total,
+            'bins': [[round(lo, 4), round(hi, 4), n] for lo, hi, n in self.bins()],
+            'p50': self.percentile(50),
+            'p90': self.percentile(90)
+        }
@@ -0,0 +1,262 @@
+"""
+Hantec AI Mentor - HTTP API (chat, retrieval, health) over mentor_core
+
+Run with: python server.py --workers 4
+The index is synced once before the workers start; every worker then
+memory-maps the same read-only serving snapshot of it.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+from contextlib import asynccontextmanager
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from answer_cache import SemanticAnswerCache
+from conversation_memory import assistant_message
+from knowledge_base import format_sync_report
+from mentor_core import INDEX_DIR, create_rag_system, astream_message
+from session_store import Session, create_session_store
+
+API_HOST = os.environ.get("HANTEC_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("HANTEC_API_PORT", "8000"))
+API_WORKERS = int(os.environ.get("HANTEC_API_WORKERS", "1"))
+# The server answers with its own key; clients never send one
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+
+MAX_MESSAGE_CHARS = 4000
+MAX_HISTORY_MESSAGES = 50
+MAX_RESULTS = 20
+# Tries to append a turn when other turns on the session keep landing first
+SESSION_SAVE_ATTEMPTS = 5
+USER_CONTEXT_FIELDS = ("name", "state", "language")
+_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+# Per-worker state, filled in by the lifespan handler
+_state = {}
+
+# ============================================================================
+# REQUEST PARSING
+# ============================================================================
+
+class BadRequest(Exception):
+    pass
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("Body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("Body must be a JSON object")
+    return body
+
+def _text_field(body, name, max_chars=MAX_MESSAGE_CHARS):
+    value = body.get(name)
+    if not isinstance(value, str) or not value.strip():
+        raise BadRequest(f"'{name}' must be a non-empty string")
+    if len(value) > max_chars:
+        raise BadRequest(f"'{name}' is longer than {max_chars} characters")
+    return value.strip()
+
+def _parse_history(body):
+    history = body.get("history", [])
+    if not isinstance(history, list) or len(history) > MAX_HISTORY_MESSAGES:
+        raise BadRequest(f"'history' must be a list of at most {MAX_HISTORY_MESSAGES} messages")
+    messages = []
+    for message in history:
+        if (not isinstance(message, dict)
+                or message.get("role") not in ("user", "assistant")
+                or not isinstance(message.get("content"), str)):
+            raise BadRequest("History messages need a 'role' (user/assistant) and a string 'content'")
+        messages.append({"role": message["role"], "content": message["content"][:MAX_MESSAGE_CHARS]})
+    return messages
+
+def _parse_session_id(body):
+    session_id = body.get("session_id")
+    if session_id is None:
+        return None
+    if not isinstance(session_id, str) or not _SESSION_ID.match(session_id):
+        raise BadRequest("'session_id' must be 8-64 letters, digits, '-' or '_'")
+    if "history" in body:
+        raise BadRequest("Send either 'session_id' or 'history', not both")
+    return session_id
+
+def _parse_user_context(body):
+    context = body.get("user_context", {})
+    if not isinstance(context, dict):
+        raise BadRequest("'user_context' must be an object")
+    return {key: str(context[key]) for key in USER_CONTEXT_FIELDS if key in context}
+
+def _error(message, status_code=400):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+async def health(request):
+    """Liveness plus the index this worker serves"""
+    rag_system = _state["rag"]
+    passages = await asyncio.to_thread(rag_system.passage_count)
+    return JSONResponse({
+        "status": "ok",
+        "index_version": rag_system.index_version,
+        "documents": rag_system.document_count(),
+        "passages": passages,
+        "worker": os.getpid()
+    })
+
+async def retrieve(request):
+    """Relevant passages for a query, best first (no LLM call)"""
+    try:
+        body = await _read_json(request)
+        query = _text_field(body, "query")
+        n_results = body.get("n_results", 5)
+        if not isinstance(n_results, int) or isinstance(n_results, bool) or not 1 <= n_results <= MAX_RESULTS:
+            raise BadRequest(f"'n_results' must be an integer from 1 to {MAX_RESULTS}")
+    except BadRequest as e:
+        return _error(str(e))
+
+    passages = await asyncio.to_thread(_state["rag"].retrieve_passages, query, n_results)
+    return JSONResponse({"query": query, "passages": passages})
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def chat(request):
+    """Answer a message; streamed as server-sent events unless "stream" is false
+
+    Events: "token" ({"delta": text}) as the answer is generated, then "done",
+    or "error" ({"error": message}) if the pipeline fails. A client that
+    disconnects cancels its request. With a "session_id" instead of a
+    "history" the conversation is kept in the session store (any worker
+    can continue it) and the answered turn is appended to it; its rolling
+    summary is updated after the response has been sent.
+    """
+    if not OPENAI_API_KEY:
+        return _error("OPENAI_API_KEY is not configured on the server", 503)
+    try:
+        body = await _read_json(request)
+        message = _text_field(body, "message")
+        history = _parse_history(body)
+        session_id = _parse_session_id(body)
+        user_context = _parse_user_context(body)
+    except BadRequest as e:
+        return _error(str(e))
+
+    session = None
+    if session_id:
+        session = await asyncio.to_thread(_state["sessions"].load, session_id) or Session(session_id)
+        history = list(session.chat_history)
+
+    async def finish(answer):
+        nonlocal session
+        if session is None:
+            return
+        turn = [{"role": "user", "content": message}, assistant_message(answer)]
+        session.chat_history.extend(turn)
+        store = _state["sessions"]
+        for _ in range(SESSION_SAVE_ATTEMPTS):
+            if await asyncio.to_thread(store.save_if_unchanged, session):
+                return
+            # Another turn on this session was saved meanwhile: add ours to it
+            session = await asyncio.to_thread(store.load, session_id) or Session(session_id)
+            session.chat_history.extend(turn)
+        raise RuntimeError("The session kept changing while saving this turn; please retry")
+
+    async def summarize():
+        # Runs after the response: if the client's next turn was saved in the
+        # meantime it wins, and that turn's own update redoes this summary
+        if session is not None and await session.memory.aupdate(session.chat_history, OPENAI_API_KEY):
+            await asyncio.to_thread(_state["sessions"].save_if_unchanged, session)
+
+    tokens = astream_message(
+        message, OPENAI_API_KEY, _state["rag"], user_context, history, _state["answer_cache"],
+        session.memory if session is not None else None
+    )
+
+    if body.get("stream", True) is False:
+        try:
+            answer = "".join([token async for token in tokens])
+        except Exception as e:
+            return _error(str(e), 502)
+        finally:
+            await tokens.aclose()
+        try:
+            await finish(answer)
+        except RuntimeError as e:
+            return _error(str(e), 409)
+        return JSONResponse({"answer": answer, "session_id": session_id}, background=BackgroundTask(summarize))
+
+    async def events():
+        try:
+            answer = ""
+            async for token in tokens:
+                answer += token
+                yield _sse("token", {"delta": token})
+            await finish(answer)
+            yield _sse("done", {"session_id": session_id})
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+        finally:
+            await tokens.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(summarize)
+    )
+
+# ============================================================================
+# APP
+# ============================================================================
+
+@asynccontextmanager
+async def lifespan(app):
+    # A shared on-disk index was synced by main() and is served from its
+    # snapshot; an in-memory one has to be built by each worker
+    shared = bool(INDEX_DIR)
+    _state["rag"] = await asyncio.to_thread(create_rag_system, not shared, shared)
+    await asyncio.to_thread(_state["rag"].warm_up)
+    _state["answer_cache"] = SemanticAnswerCache()
+    # Shared by all workers unless it is the in-process "memory" store
+    _state["sessions"] = create_session_store()
+    yield
+    _state.clear()
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/retrieve", retrieve, methods=["POST"]),
+        Route("/chat", chat, methods=["POST"]),
+    ],
+    lifespan=lifespan
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Hantec AI Mentor HTTP API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    parser.add_argument("--no-sync", action="store_true", help="Serve the index as is, without syncing it first")
+    args = parser.parse_args()
+
+    if INDEX_DIR and not args.no_sync:
+        report = create_rag_system(sync=True, serving=False).last_sync_report
+        for error in report["errors"]:
+            print(f"⚠️ {error}")
+        print(f"Index {report['index_version']}: {format_sync_report(report)}")
+
+    uvicorn.run("server:app", host=args.host, port=args.port, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Hantec AI Mentor - Session Model & Pluggable Session Stores
+
+A Session holds everything a user's conversation needs to continue on
+another worker or after a restart: flags, the onboarding profile and the
+chat history, bounded to the newest messages. Stores keep sessions as
+compact JSON, keyed by session id:
+
+    memory              in-process LRU (default; lost on restart)
+    sqlite:PATH         a local SQLite file (shared by processes on one host)
+    redis://HOST:PORT/DB  Redis or any server speaking its protocol
+                        (needs the redis package)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from conversation_memory import ConversationMemory
+
+SESSION_STORE = os.environ.get("HANTEC_SESSION_STORE", "memory")
+# Sessions idle longer than this are dropped
+SESSION_TTL_SECONDS = int(os.environ.get("HANTEC_SESSION_TTL", str(7 * 24 * 60 * 60)))
+# Newest chat messages kept per session (older ones fall off)
+MAX_SESSION_MESSAGES = int(os.environ.get("HANTEC_SESSION_MESSAGES", "100"))
+DEFAULT_MAX_SESSIONS = 10000
+SESSION_FORMAT_VERSION = 1
+
+# ============================================================================
+# SESSION MODEL
+# ============================================================================
+
+class Session:
+    """One user's conversation state; chat histories are ring buffers"""
+
+    __slots__ = (
+        'session_id', 'conversation_started', 'selected_option', 'user_state', 'onboarding_step',
+        'last_processed_message', 'message_counter', 'chat_history', 'profile', 'conversation_stage',
+        'questions_answered', 'conversation_history', 'memory', 'updated_at', '_saved'
+    )
+
+    def __init__(self, session_id=None, max_messages=MAX_SESSION_MESSAGES):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.conversation_started = False
+        self.selected_option = None
+        self.user_state = "onboarding"
+        self.onboarding_step = 2
+        self.last_processed_message = ""
+        self.message_counter = 0
+        self.chat_history = deque(maxlen=max_messages)
+        self.memory = ConversationMemory()  # Summary of chat messages flagged "summarized"
+        # Learn CFDs profiling flow (see conversation_flow)
+        self.profile = None
+        self.conversation_stage = None
+        self.questions_answered = 0
+        self.conversation_history = deque(maxlen=max_messages)
+        self.updated_at = time.time()
+        self._saved = None  # Last serialized form written to a store
+
+    def set_chat(self, messages):
+        """Replace the chat messages (the buffer keeps its size limit) and forget their summary"""
+        self.chat_history.clear()
+        self.chat_history.extend(messages)
+        self.memory = ConversationMemory()
+
+    def to_dict(self):
+        return {
+            'v': SESSION_FORMAT_VERSION,
+            'id': self.session_id,
+            'started': self.conversation_started,
+            'option': self.selected_option,
+            'state': self.user_state,
+            'step': self.onboarding_step,
+            'last': self.last_processed_message,
+            'counter': self.message_counter,
+            'chat': list(self.chat_history),
+            'summary': self.memory.summary,
+            'profile': self.profile,
+            'stage': self.conversation_stage,
+            'answered': self.questions_answered,
+            'flow': list(self.conversation_history),
+            'updated': self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data, max_messages=MAX_SESSION_MESSAGES):
+        if data.get('v') != SESSION_FORMAT_VERSION:
+            raise ValueError(f"Unsupported session format {data.get('v')!r}")
+        session = cls(data['id'], max_messages)
+        session.conversation_started = data['started']
+        session.selected_option = data['option']
+        session.user_state = data['state']
+        session.onboarding_step = data['step']
+        session.last_processed_message = data['last']
+        session.message_counter = data['counter']
+        session.chat_history.extend(data['chat'])
+        session.memory = ConversationMemory(data.get('summary', ""))
+        session.profile = data['profile']
+        session.conversation_stage = data['stage']
+        session.questions_answered = data['answered']
+        session.conversation_history.extend(data['flow'])
+        session.updated_at = data['updated']
+        return session
+
+    def dumps(self):
+        """Compact JSON bytes"""
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def loads(cls, blob):
+        session = cls.from_dict(json.loads(blob))
+        session._saved = bytes(blob)
+        return session
+
+# ============================================================================
+# STORES
+# ============================================================================
+
+class SessionStore:
+    """Where sessions live between requests.
+
+    save() only writes when the session changed since it was loaded or last
+    saved, so a rerun that changes nothing costs one serialization.
+    """
+
+    def load(self, session_id):
+        """Stored session, or None if unknown, expired or unreadable"""
+        blob = self._get(session_id)
+        if blob is None:
+            return None
+        try:
+            return Session.loads(blob)
+        except (ValueError, KeyError):
+            return None
+
+    def save(self, session):
+        """Store the session if it changed; returns True if it was written"""
+        blob = session.dumps()
+        if blob == session._saved:
+            return False
+        session.updated_at = time.time()
+        blob = session.dumps()
+        self._put(session.session_id, blob)
+        session._saved = blob
+        return True
+
+    def save_if_unchanged(self, session):
+        """Like save(), but only if the stored copy is still the one this
+        session was loaded from or last saved as (compare-and-set).
+
+        For updates that finish after other requests may have saved newer
+        turns; returns False if the session changed in the store meanwhile.
+        """
+        if session._saved is None:
+            return self.save(session)
+        blob = session.dumps()
+        if blob == session._saved:
+            return False
+        session.updated_at = time.time()
+        blob = session.dumps()
+        if not self._replace(session.session_id, session._saved, blob):
+            return False
+        session._saved = blob
+        return True
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def _get(self, session_id):
+        raise NotImplementedError
+
+    def _put(self, session_id, blob):
+        raise NotImplementedError
+
+    def _replace(self, session_id, expected, blob):
+        """Atomically store blob if the stored one equals expected; returns True if written"""
+        raise NotImplementedError
+
+class MemorySessionStore(SessionStore):
+    """LRU of serialized sessions in this process, at most max_sessions"""
+
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, ttl_seconds=SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()  # session id -> (saved at, blob)
+        self._lock = threading.Lock()
+
+    def _get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return entry[1]
+
+    def _put(self, session_id, blob):
+        with self._lock:
+            self._sessions[session_id] = (time.time(), blob)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _replace(self, session_id, expected, blob):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[1] != expected:
+                return False
+            self._sessions[session_id] = (time.time(), blob)
+            self._sessions.move_to_end(session_id)
+            return True
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+class SqliteSessionStore(SessionStore):
+    """Sessions in a local SQLite file (WAL mode, so several processes can share it)"""
+
+    def __init__(self, path, ttl_seconds=SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+        self.prune()
+
+    def _get(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl_seconds)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _put(self, session_id, blob):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, updated_at) VALUES (?, ?, ?)",
+                (session_id, blob, time.time())
+            )
+
+    def _replace(self, session_id, expected, blob):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE sessions SET data = ?, updated_at = ? WHERE id = ? AND data = ?",
+                (blob, time.time(), session_id, expected)
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def prune(self):
+        """Delete expired sessions; returns how many"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            )
+        return cursor.rowcount
+
+class RedisSessionStore(SessionStore):
+    """Sessions as Redis string keys that expire after ttl_seconds idle.
+
+    client is anything with redis-py's get/set(ex=)/delete/eval, e.g.
+    redis.Redis.from_url(...) against Redis or a compatible local server.
+    """
+
+    # Compare-and-set in one round trip: SET only if the value is unchanged
+    _REPLACE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+    def __init__(self, client, ttl_seconds=SESSION_TTL_SECONDS, prefix="hantec:session:"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _get(self, session_id):
+        return self.client.get(self.prefix + session_id)
+
+    def _put(self, session_id, blob):
+        self.client.set(self.prefix + session_id, blob, ex=self.ttl_seconds)
+
+    def _replace(self, session_id, expected, blob):
+        return bool(self.client.eval(
+            self._REPLACE_SCRIPT, 1, self.prefix + session_id, expected, blob, self.ttl_seconds
+        ))
+
+    def delete(self, session_id):
+        self.client.delete(self.prefix + session_id)
+
+def create_session_store(spec=SESSION_STORE):
+    """Session store for a spec string (see the module docstring)"""
+    if spec == "memory":
+        return MemorySessionStore()
+    if spec.startswith("sqlite:"):
+        return SqliteSessionStore(spec[len("sqlite:"):])
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError(f"Session store {spec!r} needs the redis package: pip install redis") from None
+        return RedisSessionStore(redis.Redis.from_url(spec))
+    raise ValueError(f"Unknown session store {spec!r} (use memory, sqlite:PATH or redis://...)")
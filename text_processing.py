@@ -0,0 +1,254 @@
+"""
+Hantec AI Mentor - Text Processing for Ingestion (cleaning & chunking)
+"""
+
+import re
+from collections import Counter
+
+DEFAULT_CHUNK_SIZE = 1000    # characters; MiniLM only embeds the first ~256 tokens
+DEFAULT_CHUNK_OVERLAP = 150  # characters carried over from the previous chunk
+
+HEADING_MAX_LENGTH = 100
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Bump when clean_document or chunk_text changes so existing indexes get rebuilt
+CLEANING_VERSION = 2
+
+# A line found in at least this share of files (and at least MIN_FILES of
+# them) is treated as site chrome: header, footer, menus, cookie banners...
+BOILERPLATE_MIN_FRACTION = 0.3
+BOILERPLATE_MIN_FILES = 5
+
+NAV_LINES = {'open main menu'}
+TOC_HEADINGS = {'table of contents', 'table of contents:', 'contents', 'contents:'}
+_SOURCE_LINE = re.compile(r'^SOURCE:\s*(\S+)')
+_RULE_LINE = re.compile(r'^[=\-_*]{10,}$')
+_WHITESPACE = re.compile(r'\s+')
+
+# ============================================================================
+# CLEANING
+# ============================================================================
+
+def normalize_line(line):
+    """Collapse all whitespace (incl. non-breaking spaces) to single spaces"""
+    return _WHITESPACE.sub(' ', line).strip()
+
+def find_boilerplate_lines(texts, min_fraction=BOILERPLATE_MIN_FRACTION, min_files=BOILERPLATE_MIN_FILES):
+    """Lines that repeat across many documents, returned as a sorted list.
+
+    Each line is counted at most once per document. With fewer than
+    min_files documents nothing is considered boilerplate.
+    """
+    texts = list(texts)
+    counts = Counter()
+    for text in texts:
+        counts.update({normalize_line(line) for line in text.splitlines()} - {''})
+    threshold = max(min_files, min_fraction * len(texts))
+    return sorted(line for line, count in counts.items() if count >= threshold)
+
+def _strip_breadcrumbs(lines):
+    """Drop 'Home > Section > Page' trails that the scraper put one item per line"""
+    kept = []
+    i = 0
+    while i < len(lines):
+        if (lines[i] == 'Home' and i + 2 < len(lines) and lines[i + 1] == '>'):
+            i += 1
+            while i + 1 < len(lines) and lines[i] == '>':
+                i += 2
+            continue
+        kept.append(lines[i])
+        i += 1
+    return kept
+
+def _strip_tables_of_contents(lines):
+    """Drop a 'Table of Contents:' heading together with the list that follows it"""
+    kept = []
+    i = 0
+    while i < len(lines):
+        if lines[i].lower() in TOC_HEADINGS:
+            i += 1
+            while i < len(lines) and not lines[i]:
+                i += 1
+            while i < len(lines) and lines[i]:
+                i += 1
+            continue
+        kept.append(lines[i])
+        i += 1
+    return kept
+
+def clean_document(text, boilerplate=()):
+    """Strip scraper noise from a knowledge file.
+
+    Removes the `SOURCE:` header and its rule line, navigation (menu toggles,
+    breadcrumbs, tables of contents), any line in `boilerplate` (see
+    find_boilerplate_lines) and repeated paragraphs, and normalizes
+    whitespace. Returns (cleaned_text, metadata) where metadata holds the
+    page `url` taken from the SOURCE header, if there was one.
+    """
+    metadata = {}
+    lines = [normalize_line(line) for line in text.splitlines()]
+
+    first = next((i for i, line in enumerate(lines) if line), None)
+    if first is not None:
+        match = _SOURCE_LINE.match(lines[first])
+        if match:
+            metadata['url'] = match.group(1)
+            del lines[first]
+
+    boilerplate = set(boilerplate)
+    lines = _strip_tables_of_contents(_strip_breadcrumbs(lines))
+    lines = [
+        line for line in lines
+        if line not in boilerplate and line.lower() not in NAV_LINES and not _RULE_LINE.match(line)
+    ]
+
+    paragraphs = []
+    seen = set()
+    current = []
+    for line in lines + ['']:
+        if line:
+            current.append(line)
+            continue
+        if current:
+            paragraph = "\n".join(current)
+            if paragraph not in seen:
+                seen.add(paragraph)
+                paragraphs.append(paragraph)
+            current = []
+
+    return "\n\n".join(paragraphs), metadata
+
+# ============================================================================
+# PARAGRAPHS & HEADINGS
+# ============================================================================
+
+def split_paragraphs(text):
+    """Split text into (start, end, paragraph) spans on blank lines.
+
+    Whitespace-only lines (including the non-breaking spaces the scraper
+    leaves behind) count as blank. Offsets index into the original text.
+    """
+    paragraphs = []
+    start = None
+    end = 0
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        if line.strip():
+            if start is None:
+                start = pos
+            end = pos + len(line.rstrip())
+        elif start is not None:
+            paragraphs.append((start, end, text[start:end].strip()))
+            start = None
+        pos += len(line)
+    if start is not None:
+        paragraphs.append((start, end, text[start:end].strip()))
+    return paragraphs
+
+def is_heading(paragraph):
+    """Heuristic: markdown heading, or a short single line without sentence punctuation"""
+    if paragraph.startswith('#'):
+        return True
+    if '\n' in paragraph or len(paragraph) > HEADING_MAX_LENGTH:
+        return False
+    return not paragraph.endswith(('.', '!', '?', ','))
+
+def _split_long_paragraph(start, paragraph, chunk_size, overlap):
+    """Break an oversized paragraph into sentence-aligned pieces (hard cut as last resort)"""
+    pieces = []
+    piece_start = 0
+    while piece_start < len(paragraph):
+        piece_end = min(piece_start + chunk_size, len(paragraph))
+        if piece_end < len(paragraph):
+            boundaries = [m.end() for m in _SENTENCE_END.finditer(paragraph, piece_start, piece_end)]
+            if boundaries and boundaries[-1] > piece_start + overlap:
+                piece_end = boundaries[-1]
+        pieces.append((start + piece_start, start + piece_end, paragraph[piece_start:piece_end].strip()))
+        if piece_end >= len(paragraph):
+            break
+        # Start the overlap at a sentence (or at least a word) boundary
+        overlap_start = max(piece_end - overlap, piece_start + 1)
+        boundary = (_SENTENCE_END.search(paragraph, overlap_start, piece_end)
+                    or _WHITESPACE.search(paragraph, overlap_start, piece_end))
+        piece_start = boundary.end() if boundary else piece_end
+    return pieces
+
+# ============================================================================
+# CHUNKING
+# ============================================================================
+
+def chunk_text(text, chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_CHUNK_OVERLAP):
+    """Split a document into passages of about chunk_size characters.
+
+    Chunks are built from whole paragraphs and prefer to break at headings;
+    the last paragraphs of a chunk (up to `overlap` characters) are repeated
+    at the start of the next one. A heading always goes into the chunk with
+    the text that follows it, never into a chunk of its own. Each chunk is a dict with the passage text,
+    its start/end character offsets in `text`, the heading it falls under
+    and its index within the document.
+    """
+    spans = []
+    for start, end, paragraph in split_paragraphs(text):
+        if len(paragraph) > chunk_size:
+            spans.extend(_split_long_paragraph(start, paragraph, chunk_size, overlap))
+        else:
+            spans.append((start, end, paragraph))
+
+    chunks = []
+    current = []  # (start, end, paragraph, heading)
+    current_len = 0
+    heading = ""
+
+    def flush(items):
+        chunk_heading = items[0][3]
+        body = "\n\n".join(p for _, _, p, _ in items)
+        if chunk_heading and not is_heading(items[0][2]):
+            body = f"{chunk_heading}\n\n{body}"
+        chunks.append({
+            'text': body,
+            'start': items[0][0],
+            'end': items[-1][1],
+            'heading': chunk_heading,
+            'index': len(chunks)
+        })
+
+    def split_trailing_headings(items):
+        """(items before the trailing headings, the trailing headings)
+
+        A long run of short lines is a list rather than headings and stays
+        in the body.
+        """
+        body_len = len(items)
+        while body_len and is_heading(items[body_len - 1][2]):
+            body_len -= 1
+        if sum(len(item[2]) for item in items[body_len:]) >= chunk_size // 4:
+            return items, []
+        return items[:body_len], items[body_len:]
+
+    for start, end, paragraph in spans:
+        paragraph_is_heading = is_heading(paragraph)
+        breaks_section = paragraph_is_heading and current_len >= chunk_size // 4
+        if current and (breaks_section or current_len + len(paragraph) > chunk_size):
+            body, headings = split_trailing_headings(current)
+            # Headings with no text yet stay with what follows them
+            if body:
+                flush(body)
+                carried = []
+                carried_len = 0
+                if not breaks_section and not headings:
+                    for item in reversed(body[1:]):
+                        if carried_len + len(item[2]) > overlap:
+                            break
+                        carried.insert(0, item)
+                        carried_len += len(item[2])
+                current = carried + headings
+                current_len = sum(len(item[2]) for item in current)
+        if paragraph_is_heading:
+            heading = paragraph.lstrip('#').strip()
+        current.append((start, end, paragraph, heading))
+        current_len += len(paragraph)
+
+    body, _ = split_trailing_headings(current)
+    if body or (current and not chunks):
+        flush(body or current)
+    return chunks
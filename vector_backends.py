@@ -0,0 +1,158 @@
+"""
+Hantec AI Mentor - Vector Search Backends (ChromaDB HNSW, exact NumPy brute force)
+"""
+
+import numpy as np
+
+VECTOR_BACKENDS = ("chroma", "numpy")
+# float16 rows are upcast in blocks of this many rows per batch, so the
+# temporary float32 copy stays small
+SCORE_BLOCK_ROWS = 8192
+
+# ============================================================================
+# INTERFACE
+# ============================================================================
+
+class VectorBackend:
+    """Nearest-neighbour search over the indexed passages.
+
+    search() returns, for each query embedding, passage dicts (metadata,
+    "id", "text" and cosine "distance") nearest first. fetch() returns
+    {passage_id: (passage, embedding)} for known ids, used to score passages
+    that only the BM25 index found.
+    """
+
+    name = None
+
+    def search(self, query_embeddings, n_results):
+        raise NotImplementedError
+
+    def fetch(self, passage_ids):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+# ============================================================================
+# CHROMA (approximate, HNSW)
+# ============================================================================
+
+class ChromaVectorBackend(VectorBackend):
+    """Queries a Chroma collection (HNSW, cosine space)"""
+
+    name = "chroma"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def search(self, query_embeddings, n_results):
+        if not len(query_embeddings):
+            return []
+        results = self.collection.query(
+            query_embeddings=[list(map(float, e)) for e in query_embeddings],
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        batch = []
+        for i in range(len(query_embeddings)):
+            documents = results['documents'][i] if results['documents'] else []
+            metadatas = results['metadatas'][i] if results['metadatas'] else []
+            distances = results['distances'][i] if results.get('distances') else [0.0] * len(documents)
+            batch.append([
+                {**metadata, "id": passage_id, "text": document, "distance": distance}
+                for passage_id, document, metadata, distance
+                in zip(results['ids'][i], documents, metadatas, distances)
+            ])
+        return batch
+
+    def fetch(self, passage_ids):
+        if not passage_ids:
+            return {}
+        stored = self.collection.get(ids=sorted(passage_ids), include=["documents", "metadatas", "embeddings"])
+        return {
+            passage_id: ({**metadata, "id": passage_id, "text": document}, embedding)
+            for passage_id, document, metadata, embedding in zip(
+                stored['ids'], stored['documents'], stored['metadatas'], stored['embeddings']
+            )
+        }
+
+    def count(self):
+        return self.collection.count()
+
+# ============================================================================
+# NUMPY (exact, brute force)
+# ============================================================================
+
+def normalize_rows(matrix):
+    """Unit-length float32 copy of each row (zero rows stay zero)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def top_k(scores, k):
+    """Indices and values of the k largest scores in each row, largest first.
+
+    argpartition finds each row's top k in O(N); only those k are sorted.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+    indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(scores, indices, axis=1)
+    order = np.argsort(-values, axis=1, kind='stable')
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(values, order, axis=1)
+
+class NumpyVectorBackend(VectorBackend):
+    """Exact cosine search: one matrix product over unit-normalized rows.
+
+    store is an EmbeddingStore (memory-mapped snapshot) or an
+    InMemoryPassageStore - anything with vectors, passage(row), vector(row),
+    row_of(id) and len(). A batch of queries is scored in one
+    (queries x passages) product.
+    """
+
+    name = "numpy"
+
+    def __init__(self, store):
+        self.store = store
+
+    def similarities(self, query_vectors):
+        """Cosine similarity of every row to each unit-length query, (queries x rows)"""
+        vectors = self.store.vectors
+        if vectors.dtype == np.float32:
+            return query_vectors @ vectors.T
+        scores = np.empty((len(query_vectors), len(vectors)), dtype=np.float32)
+        for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = query_vectors @ block.T
+        return scores
+
+    def search(self, query_embeddings, n_results):
+        if not len(query_embeddings):
+            return []
+        if not len(self.store):
+            return [[] for _ in query_embeddings]
+        rows, scores = top_k(self.similarities(normalize_rows(query_embeddings)), n_results)
+        return [
+            [
+                {**self.store.passage(int(row)), "distance": 1.0 - float(score)}
+                for row, score in zip(query_rows, query_scores)
+            ]
+            for query_rows, query_scores in zip(rows, scores)
+        ]
+
+    def fetch(self, passage_ids):
+        fetched = {}
+        for passage_id in passage_ids:
+            row = self.store.row_of(passage_id)
+            if row is not None:
+                fetched[passage_id] = (self.store.passage(row), self.store.vector(row))
+        return fetched
+
+    def count(self):
+        return len(self.store)